@@ -111,6 +111,8 @@ except ImportError:
 # Configuration
 DEBUG_MODE = False  # Set to True only for diagnostics
 PHOTOS_DIR = Path.home() / "photos"
+THUMBS_DIR = PHOTOS_DIR / ".thumbs"  # Gallery thumbnails, <width>/<name> (same layout as photo_server.py)
+THUMB_WIDTHS = (320, 640)  # Must match THUMB_WIDTHS in photo_server.py
 GPIO_BUTTON_PIN = 26
 BUTTON_DEBOUNCE = 0.3
 UDP_PORT = 12345
@@ -276,6 +278,7 @@ class CameraApp:
         self.remote_last_heartbeat = 0
         self.shm_sync_counter = 0
         self.last_shm_sync = 0
+        self.last_status = None  # Last status written for the web UI
         self.grayscale_mode = False
         
         # Preview surface cache
@@ -644,6 +647,11 @@ class CameraApp:
             # Delete file
             os.remove(photo_path)
             print(f"Deleted photo: {photo_path}")
+            for width in THUMB_WIDTHS:
+                try:
+                    (THUMBS_DIR / str(width) / photo_path.name).unlink()
+                except FileNotFoundError:
+                    pass
             
             # Remove from list
             self.photos.pop(self.gallery_index)
@@ -836,6 +844,11 @@ class CameraApp:
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = PHOTOS_DIR / f"photo_{timestamp}.jpg"
+        # Two shots within the same second must not overwrite each other
+        suffix = 1
+        while filename.exists():
+            filename = PHOTOS_DIR / f"photo_{timestamp}_{suffix}.jpg"
+            suffix += 1
         
         try:
             print(f"Capturing to {filename}...")
@@ -858,9 +871,16 @@ class CameraApp:
             self.apply_camera_settings()
             time.sleep(0.3)
             
-            # Capture
-            self.camera.capture_file(str(filename))
+            # Capture under a hidden temp name and rename it into place, so the
+            # photo appears in PHOTOS_DIR only once complete: the web gallery
+            # caches each file's mtime until the directory itself changes.
+            # The name doesn't end in .jpg, so the format is given explicitly
+            temp_path = PHOTOS_DIR / f".{filename.name}.tmp"
+            self.camera.capture_file(str(temp_path), format="jpeg")
+            os.replace(temp_path, filename)
             print(f"Photo saved: {filename}")
+            # Web gallery thumbnails, made now so the first gallery visit doesn't wait for them
+            threading.Thread(target=self.generate_thumbnails, args=(filename,), daemon=True).start()
             
             # Restore preview
             self.camera.stop()
@@ -889,6 +909,25 @@ class CameraApp:
             except:
                 pass
 
+    def generate_thumbnails(self, photo_path):
+        """Write the web gallery thumbnails for a new photo"""
+        try:
+            with Image.open(photo_path) as img:
+                # Let libjpeg downscale while decoding, once for the largest size
+                widest = max(THUMB_WIDTHS)
+                img.draft('RGB', (widest, img.height * widest // img.width))
+                img.load()
+                for width in sorted(THUMB_WIDTHS, reverse=True):
+                    thumb_dir = THUMBS_DIR / str(width)
+                    thumb_dir.mkdir(parents=True, exist_ok=True)
+                    temp_path = thumb_dir / f"{photo_path.name}.tmp"
+                    # Bound the width only: the gallery's srcset describes thumbnails by width
+                    img.thumbnail((width, width * 4), Image.BILINEAR)
+                    img.save(temp_path, "JPEG", quality=75)
+                    os.replace(temp_path, thumb_dir / photo_path.name)
+        except Exception as e:
+            print(f"Thumbnail error: {e}")
+
     def load_photos(self):
         """Load photo list"""
         self.photos = sorted(PHOTOS_DIR.glob("*.jpg"), reverse=True)
@@ -959,17 +998,20 @@ class CameraApp:
                         img.save(temp_path, "JPEG", quality=75)
                         os.replace(temp_path, SHARED_MEM_PREVIEW)
                         
-                        # Update status for web UI (ALWAYS SYNC)
+                        # Update status for web UI, only when it changed: the
+                        # web server serves its cached copy until the file is replaced
                         status = {
                             "iso": str(ISO_VALUES[self.current_iso_index]),
                             "shutter": SHUTTER_SPEEDS[self.current_shutter_index][0],
                             "mode": "remote" if self.remote_active else "local",
                             "status": "active"
                         }
-                        temp_status = f"{SHARED_MEM_STATUS}.tmp"
-                        with open(temp_status, 'w') as f:
-                            json.dump(status, f)
-                        os.replace(temp_status, SHARED_MEM_STATUS)
+                        if status != self.last_status:
+                            temp_status = f"{SHARED_MEM_STATUS}.tmp"
+                            with open(temp_status, 'w') as f:
+                                json.dump(status, f)
+                            os.replace(temp_status, SHARED_MEM_STATUS)
+                            self.last_status = status
                         
                     except Exception as e:
                         print(f"SHM Sync Error: {e}")
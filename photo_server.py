@@ -9,266 +9,426 @@ from socketserver import ThreadingMixIn
 import os
 from pathlib import Path
 import socket
+import select
 import json
 import time
 import datetime
 import zipfile
-import io
+import shutil
+import zlib
+import gzip
+import hashlib
+import struct
 import subprocess
+import re
+from html import escape as html_escape
+import urllib.parse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 PHOTOS_DIR = Path.home() / "photos"
+PHOTOS_DIR_STR = str(PHOTOS_DIR)  # For os.path string ops in per-file loops
+THUMBS_DIR_STR = os.path.join(PHOTOS_DIR_STR, ".thumbs")
+THUMB_WIDTHS = (320, 640)  # Thumbnail variants offered to the gallery through srcset
 PORT = 8080
 UDP_PORT = 12345
 SHARED_MEM_PREVIEW = "/tmp/camera_preview.jpg"
 SHARED_MEM_STATUS = "/tmp/camera_status.json"
+FRAME_WAIT_TIMEOUT = 1.0  # Max wait for a new frame before checking again
+STREAM_KEEPALIVE = 5.0  # Resend the last frame this often so dead clients get noticed
+KEEPALIVE_TIMEOUT = 2  # Seconds an idle keep-alive connection may hold a worker between requests
+REQUEST_TIMEOUT = 30  # Socket timeout once a request has started (slow uploads/downloads)
+MAX_STREAM_CLIENTS = 8  # Concurrent MJPEG viewers
+MAX_STATUS_CLIENTS = 8  # Concurrent status event streams
+KEEPALIVE_CLIENTS = 4  # Browsers expected at once, each keeping up to 6 connections open
+# Request handler threads: every open stream keeps one busy, and so does every
+# idle keep-alive connection until KEEPALIVE_TIMEOUT runs out
+MAX_WORKERS = MAX_STREAM_CLIENTS + MAX_STATUS_CLIENTS + 6 * KEEPALIVE_CLIENTS
+STATUS_POLL_INTERVAL = 0.25  # How often a status stream checks the camera status file
+STATUS_HEARTBEAT_INTERVAL = 3.0  # Remote-mode heartbeat to the camera app / SSE keepalive
+MAX_POST_BODY = 1024 * 1024  # Bytes; the largest body is a JSON list of photo names
+IO_WORKERS = 8  # Parallel unlinks for bulk delete; SD card latency, not bandwidth, is the limit
+IP_CACHE_TTL = 60.0  # Seconds before `hostname -I` is asked again
+GALLERY_CARDS_PER_WRITE = 50  # Cards encoded and sent per socket write when streaming the gallery
+GALLERY_PAGE_SIZE = 60  # Cards in the first gallery page and in each scroll-triggered batch
+GALLERY_PAGE_MAX = 500  # Upper bound on a client-requested ?limit=
+GZIP_LEVEL = 6
+ZIP_COPY_CHUNK = 1024 * 1024  # Bytes per read/write when streaming photos into a ZIP
+# For URLs that carry a version (?v=): photos by mtime, assets by content hash.
+# A photo can be overwritten under the same name (two shots in one second).
+PHOTO_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Per-frame multipart header, formatted with the JPEG length
+MJPEG_PART_HEADER = b'--FRAME\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
+
+# Plain photo file names only: no separators, so no way out of PHOTOS_DIR
+def is_photo_name(name):
+    """True for a name list_photos() would show: a visible .jpg basename.
+    Spaces, quotes and the like are fine; path separators are not."""
+    return (isinstance(name, str) and name.endswith('.jpg') and not name.startswith('.')
+            and '/' not in name and '\0' not in name)
+
+# Try to import inotify for event-driven MJPEG frames
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+    print("Warning: inotify_simple not installed, MJPEG stream will poll for new frames")
+
+# Try to import orjson for faster JSON parsing/encoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def json_loads(data):
+    """Parse a JSON request body (bytes or str)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj):
+    """Serialize obj to JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+# gzip member header: deflate, no flags, no mtime, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+def deflate_piece(data):
+    """Raw-deflate data into a byte-aligned piece that can be spliced into a
+    larger deflate stream (fresh window, ends with a sync flush, not final)"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+class GzipPieceWriter:
+    """Write a gzip body out of pieces that were deflated ahead of time"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.crc = 0
+        self.size = 0
+        wfile.write(GZIP_HEADER)
+
+    def write(self, data, deflated):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.wfile.write(deflated)
+
+    def close(self):
+        # Empty final block, then CRC32 and length of the uncompressed body
+        self.wfile.write(b'\x03\x00' + struct.pack('<II', self.crc, self.size & 0xffffffff))
+
+class ChunkedWriter:
+    """Frame every write as an HTTP/1.1 chunk, for bodies of unknown length"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if data:
+            self.wfile.write(b'%X\r\n%b\r\n' % (len(data), data))
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b'0\r\n\r\n')
+
+class PlainPieceWriter:
+    """Same interface as GzipPieceWriter for clients without gzip"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data, deflated):
+        self.wfile.write(data)
+
+    def close(self):
+        pass
 
-class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
-    """Handle requests in a separate thread."""
-    daemon_threads = True
-
-class PhotoHandler(SimpleHTTPRequestHandler):
-    """Custom handler to serve photos"""
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=str(PHOTOS_DIR), **kwargs)
-    
-    def do_GET(self):
-        """Handle GET requests"""
-        if self.path == '/':
-            self.list_directory(self.path)
-        elif self.path == '/live':
-            self.serve_live_page()
-        elif self.path == '/api/status':
-            self.serve_status()
-        elif self.path == '/stream.mjpg':
-            self.serve_mjpeg_stream()
-        elif self.path == '/preview.jpg':
-            self.serve_preview()
-        else:
-            # Fallback to serving files
-            super().do_GET()
-
-    def do_POST(self):
-        """Handle POST requests (for delete, download zip, commands, and system control)"""
-        if self.path.startswith('/delete/'):
-            filename = self.path.replace('/delete/', '')
-            file_path = PHOTOS_DIR / filename
-            
-            try:
-                if file_path.exists() and file_path.suffix.lower() == '.jpg':
-                    file_path.unlink()
-                    print(f"Deleted file: {filename}")
-                    
-                    # Redirect back to gallery
-                    self.send_response(303)
-                    self.send_header('Location', '/')
-                    self.end_headers()
-                else:
-                    self.send_error(404, "File not found")
-            except Exception as e:
-                self.send_error(500, f"Error deleting file: {e}")
-
-        elif self.path == '/delete_multiple':
-            length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(length).decode('utf-8')
-            try:
-                data = json.loads(body)
-                files = data.get('files', [])
-                deleted, errors = [], []
-                for name in files:
-                    fp = PHOTOS_DIR / Path(name).name  # sanitise
-                    if fp.exists() and fp.suffix.lower() == '.jpg':
-                        fp.unlink()
-                        deleted.append(name)
-                        print(f"Deleted: {name}")
-                    else:
-                        errors.append(name)
-                response = json.dumps({'deleted': deleted, 'errors': errors}).encode()
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(response)
-            except Exception as e:
-                self.send_error(500, f"Error in batch delete: {e}")
-
-        elif self.path == '/download_zip':
-            length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(length).decode('utf-8')
-            try:
-                data = json.loads(body)
-                files = data.get('files', [])
-                buf = io.BytesIO()
-                with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-                    for name in files:
-                        fp = PHOTOS_DIR / Path(name).name
-                        if fp.exists() and fp.suffix.lower() == '.jpg':
-                            zf.write(fp, fp.name)
-                zip_bytes = buf.getvalue()
-                ts = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f'foto_{ts}.zip'
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/zip')
-                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-                self.send_header('Content-Length', str(len(zip_bytes)))
-                self.end_headers()
-                self.wfile.write(zip_bytes)
-            except Exception as e:
-                self.send_error(500, f"Error creating ZIP: {e}")
+# Try to import Pillow for gallery thumbnails
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("Warning: Pillow not installed, gallery will load full-size photos")
+
+def ensure_thumbnail(name, width):
+    """Return the path of an up-to-date `width` px thumbnail for photo `name`, creating it if needed"""
+    src = os.path.join(PHOTOS_DIR_STR, name)
+    dst_dir = os.path.join(THUMBS_DIR_STR, str(width))
+    dst = os.path.join(dst_dir, name)
+    src_mtime = os.stat(src).st_mtime_ns
+    try:
+        if os.stat(dst).st_mtime_ns >= src_mtime:
+            return dst
+    except FileNotFoundError:
+        pass
 
-        elif self.path == '/system/shutdown':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status":"shutting down"}')
-            print("Shutdown requested via web")
-            subprocess.Popen(['sudo', 'shutdown', 'now'])
+    os.makedirs(dst_dir, exist_ok=True)
+    temp_path = f"{dst}.{threading.get_ident()}.tmp"
+    with Image.open(src) as img:
+        # Let libjpeg downscale while decoding, then finish the resize
+        img.draft('RGB', (width, img.height * width // img.width))
+        # Bound the width only, so portrait shots are really `width` px wide as
+        # srcset's "w" descriptors say; bilinear is plenty after draft()
+        img.thumbnail((width, width * 4), Image.BILINEAR)
+        img.save(temp_path, "JPEG", quality=75)
+    os.replace(temp_path, dst)
+    return dst
+
+# Shared pool for blocking file operations fanned out by a single request
+IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="photo-io")
+
+def delete_photo(name):
+    """Delete a photo and its thumbnails; return True on success"""
+    try:
+        os.unlink(os.path.join(PHOTOS_DIR_STR, name))
+    except OSError:
+        return False
+    remove_thumbnail(name)
+    print(f"Deleted: {name}")
+    return True
+
+def remove_thumbnail(name):
+    """Drop the cached thumbnails of a deleted photo"""
+    for width in THUMB_WIDTHS:
+        try:
+            os.unlink(os.path.join(THUMBS_DIR_STR, str(width), name))
+        except FileNotFoundError:
+            pass
 
-        elif self.path == '/system/reboot':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status":"rebooting"}')
-            print("Reboot requested via web")
-            subprocess.Popen(['sudo', 'reboot'])
+class PreviewWatcher:
+    """Wait for the camera app to publish a new preview frame"""
 
-        elif self.path == '/api/command':
-            length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(length).decode('utf-8')
+    def __init__(self):
+        self.inotify = None
+        self.name = os.path.basename(SHARED_MEM_PREVIEW)
+        if INOTIFY_AVAILABLE:
             try:
-                data = json.loads(post_data)
-                command = data.get('command')
-                if command:
-                    self.send_udp_command(command)
-                    self.send_response(200)
-                    self.end_headers()
-                    self.wfile.write(b'{"status":"ok"}')
-                else:
-                    self.send_error(400, "Missing command")
-            except Exception as e:
-                self.send_error(500, f"Error processing command: {e}")
-
-    def send_udp_command(self, command):
-        """Send command to camera app via UDP"""
+                self.inotify = INotify()
+                # The camera app publishes frames with os.replace(), so watch the
+                # directory for the rename instead of the (short-lived) file inode
+                self.inotify.add_watch(os.path.dirname(SHARED_MEM_PREVIEW),
+                                       inotify_flags.MOVED_TO | inotify_flags.CLOSE_WRITE)
+            except OSError as e:
+                print(f"inotify Error: {e}")
+                self.close()
+
+    def wait(self, timeout):
+        """Block until a new frame is written; False if timeout expires first"""
+        if self.inotify is None:
+            time.sleep(0.1) # Limit to ~10 FPS
+            return True
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            for event in self.inotify.read(timeout=int(remaining * 1000)):
+                if event.name == self.name:
+                    return True
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+class FrameBroadcaster:
+    """Read each preview frame once and hand it to every MJPEG client.
+
+    A single reader thread runs while at least one client is subscribed; clients
+    block in next_frame() on a shared condition instead of each polling the file.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.part = None  # Ready-to-send multipart chunk for the latest frame
+        self.seq = 0
+        self.clients = 0
+        self.running = False
+
+    def subscribe(self):
+        """Register a client; False if MAX_STREAM_CLIENTS are already watching"""
+        with self.cond:
+            if self.clients >= MAX_STREAM_CLIENTS:
+                return False
+            self.clients += 1
+            self.start_reader()
+            return True
+
+    def unsubscribe(self):
+        with self.cond:
+            self.clients -= 1
+            if self.clients == 0:
+                # Don't greet the next viewer with a frame from long ago
+                self.part = None
+
+    def start_reader(self):
+        """Start the reader thread unless it is running; call with cond held"""
+        if not self.running:
+            self.running = True
+            threading.Thread(target=self.run, name="mjpeg-reader", daemon=True).start()
+
+    def next_frame(self, last_seq, timeout):
+        """Wait for a frame newer than last_seq; on timeout return the current one"""
+        with self.cond:
+            # The reader stops on an unexpected error; bring it back for the
+            # viewers still waiting rather than replaying its last frame forever
+            if self.clients > 0:
+                self.start_reader()
+            self.cond.wait_for(lambda: self.seq != last_seq, timeout)
+            return self.seq, self.part
+
+    def run(self):
+        watcher = PreviewWatcher()
+        last_frame_id = None
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.sendto(command.encode('utf-8'), ('localhost', UDP_PORT))
+            while True:
+                with self.cond:
+                    if self.clients == 0:
+                        self.running = False
+                        return
+                try:
+                    f = open(SHARED_MEM_PREVIEW, 'rb')
+                except FileNotFoundError:
+                    # Camera app not running (yet) or restarting
+                    time.sleep(0.5)
+                    continue
+                with f:
+                    # Every frame is a new file (os.replace), so inode + mtime
+                    # identify it without reading the JPEG
+                    st = os.fstat(f.fileno())
+                    frame_id = (st.st_ino, st.st_mtime_ns)
+                    if frame_id != last_frame_id:
+                        frame = f.read()
+                        if frame:
+                            # Boundary, part headers, JPEG and trailing CRLF, built once for all clients
+                            part = b''.join((MJPEG_PART_HEADER % len(frame), frame, b'\r\n'))
+                            with self.cond:
+                                self.part = part
+                                self.seq += 1
+                                self.cond.notify_all()
+                            last_frame_id = frame_id
+
+                # Sleep until the camera publishes the next frame
+                watcher.wait(FRAME_WAIT_TIMEOUT)
         except Exception as e:
-            print(f"UDP Error: {e}")
-
-    def serve_status(self):
-        """Serve camera status from shared memory"""
-        try:
-            if os.path.exists(SHARED_MEM_STATUS):
-                with open(SHARED_MEM_STATUS, 'r') as f:
-                    data = f.read()
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(data.encode('utf-8'))
-            else:
-                # Default status if not running
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"iso":"--", "shutter":"--", "mode":"local"}')
-        except Exception:
-            self.send_error(500, "Error reading status")
-
-    def serve_preview(self):
-        """Serve preview image from shared memory"""
+            print(f"MJPEG reader error: {e}")
+            with self.cond:
+                self.running = False
+        finally:
+            watcher.close()
+
+frame_broadcaster = FrameBroadcaster()
+status_stream_slots = threading.BoundedSemaphore(MAX_STATUS_CLIENTS)
+# Open live-page status streams; the camera is in remote mode while any is open
+_live_viewers_lock = threading.Lock()
+_live_viewers = {'count': 0}
+
+# Reported while the camera app isn't running
+STATUS_OFFLINE = b'{"iso":"--", "shutter":"--", "mode":"local"}'
+# Last status file read: ((inode, mtime), bytes)
+_status_cache = {'entry': (None, b'')}
+
+def read_status():
+    """Return the camera status JSON as bytes, or an offline default"""
+    try:
+        st = os.stat(SHARED_MEM_STATUS)
+    except FileNotFoundError:
+        return STATUS_OFFLINE
+    # The camera app replaces the file on every change, so inode and mtime
+    # identify its contents; polls in between skip the open and read
+    key = (st.st_ino, st.st_mtime_ns)
+    cached_key, body = _status_cache['entry']
+    if key != cached_key:
+        # The camera app already writes UTF-8 JSON, pass the bytes through
         try:
-            if os.path.exists(SHARED_MEM_PREVIEW):
-                with open(SHARED_MEM_PREVIEW, 'rb') as f:
-                    data = f.read()
-                self.send_response(200)
-                self.send_header('Content-type', 'image/jpeg')
-                self.end_headers()
-                self.wfile.write(data)
-            else:
-                self.send_error(404, "No preview available")
-        except Exception:
-            self.send_error(500, "Error reading preview")
+            with open(SHARED_MEM_STATUS, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return STATUS_OFFLINE
+        _status_cache['entry'] = (key, body)
+    return body
 
-    def serve_mjpeg_stream(self):
-        """Serve MJPEG stream from shared memory"""
-        self.send_response(200)
-        self.send_header('Age', '0')
-        self.send_header('Cache-Control', 'no-cache, private')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=FRAME')
-        self.end_headers()
-        
-        try:
-            while True:
-                if os.path.exists(SHARED_MEM_PREVIEW):
-                    with open(SHARED_MEM_PREVIEW, 'rb') as f:
-                        frame = f.read()
-                    
-                    self.wfile.write(b'--FRAME\r\n')
-                    self.send_header('Content-Type', 'image/jpeg')
-                    self.send_header('Content-Length', len(frame))
-                    self.end_headers()
-                    self.wfile.write(frame)
-                    self.wfile.write(b'\r\n')
-                    
-                    time.sleep(0.1) # Limit to ~10 FPS
-                else:
-                    time.sleep(0.5)
-        except Exception:
-            pass # Client disconnected
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    """Handle requests on a fixed pool of MAX_WORKERS threads (sized next to
+    the stream and keep-alive limits it has to cover)."""
+    daemon_threads = True
+    request_queue_size = 32
 
-    def serve_live_page(self):
-        """Serve the Live Control interface in Material Design 3 style"""
-        html = """
-<!DOCTYPE html>
-<html lang="it">
-<head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>Live Control | Pi Camera</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:ital,opsz,wght@0,14..32,100..900;1,14..32,100..900&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Material+Symbols+Outlined:opsz,wght,FILL,GRAD@20..48,100..700,0..1,-50..200" />
-    <style>
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Reuse threads instead of spawning one per connection; daemon threads
+        # so open MJPEG streams never block interpreter exit
+        self.pending = queue.Queue()
+        for i in range(MAX_WORKERS):
+            threading.Thread(target=self.worker, name=f"http-worker-{i}", daemon=True).start()
+
+    def worker(self):
+        while True:
+            request, client_address = self.pending.get()
+            self.process_request_thread(request, client_address)
+
+    def process_request(self, request, client_address):
+        self.pending.put((request, client_address))
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+# Gallery stylesheet, served minified from /app.css
+GALLERY_CSS = """
         :root {
-            --m3-surface: #121212;
+            --m3-surface: #1C1B1F;
             --m3-on-surface: #E6E1E5;
+            --m3-surface-container: #2B2930;
             --m3-primary: #D0BCFF;
             --m3-on-primary: #381E72;
-            --m3-secondary: #CCC2DC;
-            --m3-surface-variant: #49454F;
-            --m3-on-surface-variant: #CAC4D0;
+            --m3-secondary-container: #4A4458;
+            --m3-on-secondary-container: #E8DEF8;
             --m3-outline: #938F99;
+            --m3-error: #F2B8B5;
+            --m3-error-container: #8C1D18;
         }
-
-        body { 
-            font-family: 'Inter', sans-serif; 
-            background: var(--m3-surface); 
-            color: var(--m3-on-surface); 
-            margin: 0;
-            padding: 0;
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            overflow: hidden;
+        
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        
+        body {
+            font-family: system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif;
+            background: var(--m3-surface);
+            color: var(--m3-on-surface);
+            min-height: 100vh;
+            padding-bottom: 120px;
         }
 
-        /* Top App Bar */
+        /* App Bar */
         .app-bar {
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
             height: 64px;
             display: flex;
             align-items: center;
-            padding: 0 16px;
-            box-sizing: border-box;
+            padding: 0 4px 0 16px;
+            position: sticky;
+            top: 0;
             background: var(--m3-surface);
-            z-index: 100;
+            z-index: 10;
+            gap: 4px;
         }
 
+        .app-title { font-size: 22px; font-weight: 400; flex: 1; }
+
         .icon-btn {
             background: transparent;
             border: none;
@@ -280,999 +440,1729 @@ class PhotoHandler(SimpleHTTPRequestHandler):
             display: flex;
             align-items: center;
             justify-content: center;
-            transition: background 0.2s;
-            text-decoration: none;
+            flex-shrink: 0;
+            transition: background 0.15s;
         }
-        .icon-btn:active { background: rgba(255,255,255,0.1); }
+        .icon-btn:hover { background: rgba(255,255,255,0.08); }
+        .icon-btn.active { background: rgba(208,188,255,0.15); color: var(--m3-primary); }
+        .icon-btn.error { color: var(--m3-error); }
         .icon-btn svg { width: 24px; height: 24px; }
-        .btn-tonal svg { width: 18px; height: 18px; }
-        .fab-capture svg { width: 36px; height: 36px; }
-        
-        .app-title {
-            margin-left: 8px;
-            font-size: 22px;
-            font-weight: 400;
-        }
 
-        /* Preview Container */
-        .preview-wrapper {
-            position: absolute;
-            top: 64px; /* below app bar */
-            bottom: 120px; /* above control panel */
-            left: 0;
-            right: 0;
-            display: flex;
+        /* Selection mode app bar */
+        .sel-bar {
+            display: none;
+            height: 64px;
             align-items: center;
-            justify-content: center;
-            background: #000;
-            z-index: 1;
-        }
-
-        #preview { 
-            max-width: 100%; 
-            max-height: 100%; 
-            object-fit: contain; 
-            background: #111;
-            width: 100%;
-            height: 100%;
+            padding: 0 8px;
+            position: sticky;
+            top: 0;
+            background: var(--m3-secondary-container);
+            z-index: 10;
+            gap: 4px;
         }
+        .sel-bar.visible { display: flex; }
+        .sel-count { flex: 1; font-size: 18px; font-weight: 500; padding-left: 8px; color: var(--m3-on-secondary-container); }
 
-        .status-overlay {
-            position: absolute;
-            top: 16px;
-            right: 16px;
-            background: rgba(0,0,0,0.5);
-            padding: 4px 12px;
+        /* Info Banner */
+        .info-header {
+            padding: 12px 16px;
+            background: var(--m3-surface-container);
+            margin: 16px;
             border-radius: 16px;
-            font-size: 12px;
             display: flex;
+            justify-content: space-between;
             align-items: center;
-            gap: 8px;
-            backdrop-filter: blur(4px);
+            font-size: 14px;
+            color: var(--m3-on-secondary-container);
         }
 
-        .pulse {
-            width: 8px;
-            height: 8px;
-            background: #ff5252;
-            border-radius: 50%;
-            animation: pulse 1.5s infinite;
-        }
-        @keyframes pulse {
-            0% { transform: scale(1); opacity: 1; }
-            50% { transform: scale(1.5); opacity: 0.5; }
-            100% { transform: scale(1); opacity: 1; }
+        .gallery {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
+            gap: 16px;
+            padding: 16px;
         }
 
-        /* Bottom Control Panel */
-        .control-panel {
-            position: absolute;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            background: #1C1B1F;
-            /* Extra padding to lift controls above the mobile swipe bar / nav bar */
-            padding: 16px 8px calc(24px + env(safe-area-inset-bottom, 0px)) 8px;
-            box-sizing: border-box;
-            border-radius: 28px 28px 0 0;
+        /* Card */
+        .m3-card {
+            background: var(--m3-surface-container);
+            border-radius: 12px;
+            overflow: hidden;
             display: flex;
             flex-direction: column;
-            gap: 16px;
-            box-shadow: 0 -4px 12px rgba(0,0,0,0.3);
-            z-index: 10;
+            transition: transform 0.15s, outline 0.15s;
+            position: relative;
+            /* Skip layout and paint for cards scrolled out of view */
+            content-visibility: auto;
+            contain-intrinsic-size: auto 320px;
         }
-
-        .controls-row {
-            display: grid;
-            grid-template-columns: 1fr auto 1fr;
-            align-items: center;
-            gap: 8px;
-            width: 100%;
+        .m3-card.selected {
+            outline: 3px solid var(--m3-primary);
         }
 
-        .m3-card {
-            background: var(--m3-surface-variant);
-            border-radius: 12px;
-            padding: 8px 4px;
-            display: flex;
-            flex-direction: column;
+        /* Checkbox overlay */
+        .card-check {
+            position: absolute;
+            top: 10px;
+            left: 10px;
+            width: 28px;
+            height: 28px;
+            border-radius: 50%;
+            background: rgba(0,0,0,0.55);
+            border: 2px solid rgba(255,255,255,0.8);
+            display: none;
             align-items: center;
-            gap: 4px;
-            min-width: 0;
+            justify-content: center;
+            cursor: pointer;
+            z-index: 2;
+            transition: background 0.15s, border-color 0.15s;
         }
-
-        .label {
-            font-size: 10px;
-            font-weight: 500;
-            color: var(--m3-on-surface-variant);
-            letter-spacing: 0.5px;
-            text-transform: uppercase;
-            white-space: nowrap;
-            overflow: hidden;
-            text-overflow: ellipsis;
-            max-width: 100%;
+        .card-check svg { width: 16px; height: 16px; fill: white; display: none; }
+        .m3-card.selected .card-check {
+            background: var(--m3-primary);
+            border-color: var(--m3-primary);
         }
+        .m3-card.selected .card-check svg { display: block; }
+        body.select-mode .card-check { display: flex; }
+        body.select-mode .m3-card img { cursor: default; }
 
-        .value {
-            font-size: 16px;
-            font-weight: 500;
-            color: var(--m3-on-surface);
-            min-width: 40px;
-            text-align: center;
+        /* Fixed box whatever the photo's orientation: no shift as thumbnails load */
+        .m3-card img {
+            width: 100%;
+            height: 200px;
+            object-fit: cover;
+            cursor: pointer;
+            display: block;
         }
 
-        .adj-btns { display: flex; gap: 4px; }
+        .card-content { padding: 12px; flex: 1; }
+        .file-name { font-size: 14px; font-weight: 500; margin-bottom: 4px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+        .file-date { font-size: 12px; color: var(--m3-outline); }
 
-        .btn-tonal {
-            background: var(--m3-secondary);
-            color: var(--m3-on-primary);
+        .card-actions {
+            padding: 8px;
+            display: flex;
+            justify-content: flex-end;
+            gap: 8px;
+            border-top: 1px solid rgba(255,255,255,0.05);
+        }
+        body.select-mode .card-actions { display: none; }
+
+        .text-btn {
+            background: transparent;
             border: none;
-            height: 32px;
-            width: 32px;
+            color: var(--m3-primary);
+            padding: 8px 12px;
             border-radius: 8px;
+            font-weight: 500;
+            font-size: 14px;
             cursor: pointer;
+            text-decoration: none;
             display: flex;
             align-items: center;
+            gap: 6px;
+        }
+        .text-btn.delete { color: var(--m3-error); }
+        .text-btn:hover { background: rgba(208, 188, 255, 0.08); }
+        .text-btn.delete:hover { background: rgba(242, 184, 181, 0.08); }
+
+        /* Bulk action bar */
+        .bulk-bar {
+            display: none;
+            position: fixed;
+            bottom: 0;
+            left: 0;
+            right: 0;
+            height: 80px;
+            background: var(--m3-secondary-container);
+            align-items: center;
             justify-content: center;
+            gap: 12px;
+            z-index: 200;
+            padding: 0 24px;
+            box-shadow: 0 -4px 16px rgba(0,0,0,0.4);
         }
-        .btn-tonal .material-symbols-outlined { font-size: 18px; }
+        .bulk-bar.visible { display: flex; }
 
-        /* Capture Button - Rounded & Broken (Circle) */
-        .fab-capture {
-            width: 72px;
-            height: 72px;
-            border-radius: 50%;
-            background: var(--m3-primary);
-            color: var(--m3-on-primary);
+        .bulk-btn {
+            height: 48px;
+            padding: 0 24px;
+            border-radius: 24px;
             border: none;
+            font-size: 15px;
+            font-weight: 600;
             cursor: pointer;
             display: flex;
             align-items: center;
-            justify-content: center;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.4);
-            transition: transform 0.1s, box-shadow 0.2s;
-            margin: 0 4px;
+            gap: 8px;
+            transition: transform 0.1s, opacity 0.1s;
         }
-        .fab-capture:active { transform: scale(0.95); }
-        .fab-capture .material-symbols-outlined { font-size: 36px; }
+        .bulk-btn:active { transform: scale(0.97); }
+        .bulk-btn.download { background: var(--m3-primary); color: var(--m3-on-primary); }
+        .bulk-btn.del { background: var(--m3-error-container); color: var(--m3-error); }
+        .bulk-btn svg { width: 20px; height: 20px; fill: currentColor; }
+        .bulk-btn:disabled { opacity: 0.4; cursor: not-allowed; }
 
-        /* LANDSCAPE MODE & DESKTOP (Direct UI update) */
-        @media (min-width: 600px), (orientation: landscape) {
-            .app-bar { display: none !important; }
-            .preview-wrapper { 
-                position: fixed; 
-                inset: 0; 
-                z-index: 1; 
-                height: 100vh;
-                width: 100vw;
-                background: #000;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }
-            #preview { 
-                max-width: 100%; 
-                max-height: 100%; 
-                width: 100%;
-                height: 100%;
-                object-fit: contain; 
-            }
-            
-            .control-panel {
-                position: fixed;
-                bottom: 16px;
-                left: 50%;
-                transform: translateX(-50%);
-                width: auto;
-                min-width: 0;
-                max-width: 95vw;
-                border-radius: 40px;
-                padding: 12px 24px;
-                background: rgba(28, 27, 31, 0.85);
-                backdrop-filter: blur(16px);
-                border: 1px solid rgba(255,255,255,0.15);
-                gap: 16px;
-                z-index: 100;
-                
-                /* Fix alignment with flexbox */
-                display: flex !important;
-                flex-direction: row !important;
-                align-items: center;
-                justify-content: center;
-                overflow-x: auto;
-            }
-            
-            .controls-row { 
-                display: flex !important;
-                flex-direction: row;
-                align-items: center;
-                justify-content: center;
-                gap: 16px;
-            }
-            
-            .m3-card { 
-                background: transparent; 
-                padding: 0; 
-                border: none; 
-                box-shadow: none;
-                min-width: auto;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                gap: 8px;
-            }
-            
-            .fab-capture { 
-                width: 64px; 
-                height: 64px; 
-                flex-shrink: 0;
-            }
-            
-            .label { display: none; }
-            .value { font-size: 14px; min-width: auto; }
-            
-            /* Persistent Float Back */
-            .back-container {
-                position: fixed;
-                top: 16px;
-                left: 16px;
-                z-index: 1000;
-                display: block !important;
-            }
+        /* FAB */
+        .fab {
+            position: fixed;
+            bottom: 24px;
+            right: 24px;
+            height: 56px;
+            padding: 0 24px;
+            border-radius: 16px;
+            background: var(--m3-primary);
+            color: var(--m3-on-primary);
+            display: flex;
+            align-items: center;
+            gap: 12px;
+            text-decoration: none;
+            font-weight: 500;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.3);
+            transition: box-shadow 0.2s, transform 0.2s;
+            z-index: 100;
         }
+        .fab:active { transform: scale(0.95); }
+        body.select-mode .fab { display: none; }
 
-        .offline-overlay {
-            position: absolute;
-            inset: 0;
-            background: rgba(0,0,0,0.8);
+        /* Power dialog */
+        .dialog-backdrop {
             display: none;
-            flex-direction: column;
-            align-items: center;
+            position: fixed;
+            inset: 0;
+            background: rgba(0,0,0,0.6);
+            z-index: 500;
+            align-items: flex-end;
             justify-content: center;
-            gap: 16px;
-            z-index: 5;
+            padding: 24px;
         }
+        .dialog-backdrop.open { display: flex; }
+        .power-dialog {
+            background: #2B2930;
+            border-radius: 28px;
+            padding: 24px;
+            width: 100%;
+            max-width: 360px;
+            display: flex;
+            flex-direction: column;
+            gap: 12px;
+            margin-bottom: env(safe-area-inset-bottom, 0);
+        }
+        .dialog-title {
+            font-size: 18px;
+            font-weight: 600;
+            text-align: center;
+            padding-bottom: 8px;
+            color: var(--m3-on-surface);
+        }
+        .power-option {
+            display: flex;
+            align-items: center;
+            gap: 16px;
+            padding: 16px;
+            border-radius: 16px;
+            background: var(--m3-surface-container);
+            border: none;
+            color: var(--m3-on-surface);
+            cursor: pointer;
+            font-size: 16px;
+            font-weight: 500;
+            font-family: inherit;
+            transition: background 0.15s;
+        }
+        .power-option:hover { background: #3B3940; }
+        .power-option svg { width: 28px; height: 28px; flex-shrink: 0; }
+        .power-option.reboot svg { fill: #A8C7FA; }
+        .power-option.shutdown svg { fill: var(--m3-error); }
+        .power-option-label { text-align: left; }
+        .power-option-label span { display: block; font-size: 12px; color: var(--m3-outline); font-weight: 400; margin-top: 2px; }
+        .dialog-cancel {
+            background: transparent;
+            border: 1px solid rgba(255,255,255,0.12);
+            color: var(--m3-on-surface);
+            border-radius: 12px;
+            padding: 14px;
+            font-size: 15px;
+            font-family: inherit;
+            cursor: pointer;
+            margin-top: 4px;
+            transition: background 0.15s;
+        }
+        .dialog-cancel:hover { background: rgba(255,255,255,0.06); }
 
-        .back-container { display: none; }
-    </style>
-</head>
-<body>
-    <header class="app-bar">
-        <a href="/" class="icon-btn">
-            <svg fill="currentColor" viewBox="0 0 24 24"><path d="M20 11H7.83l5.59-5.59L12 4l-8 8 8 8 1.41-1.41L7.83 13H20v-2z"/></svg>
-        </a>
-        <div class="app-title">Controllo Live</div>
-    </header>
-
-    <div class="back-container">
-        <a href="/" class="icon-btn" style="background: rgba(0,0,0,0.5); backdrop-filter: blur(8px); border-radius: 50%;">
-            <svg fill="white" viewBox="0 0 24 24"><path d="M20 11H7.83l5.59-5.59L12 4l-8 8 8 8 1.41-1.41L7.83 13H20v-2z"/></svg>
-        </a>
-    </div>
-
-    <main class="preview-wrapper">
-        <img id="preview" src="/stream.mjpg" alt="Stream Camera">
-        
-        <div class="status-overlay">
-            <div class="pulse"></div>
-            <span>LIVE <span id="res-info" style="opacity: 0.6; font-size: 10px; margin-left: 4px"></span></span>
-        </div>
-
-        <div id="offline-msg" class="offline-overlay">
-            <svg width="48" height="48" fill="var(--m3-outline)" viewBox="0 0 24 24"><path d="M9 2L7.17 4H4c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V6c0-1.1-.9-2-2-2h-3.17L15 2H9zm3 15c-2.76 0-5-2.24-5-5s2.24-5 5-5 5 2.24 5 5-2.24 5-5 5z"/><circle cx="12" cy="12" r="3"/></svg>
-            <span style="font-weight:500">Telecomando non attivo</span>
-            <span style="font-size: 14px; color: var(--m3-on-surface-variant)">Tocca lo schermo della camera</span>
-        </div>
-    </main>
-
-    <footer class="control-panel">
-        <div class="controls-row">
-            <!-- ISO -->
-            <div class="m3-card">
-                <span class="label">ISO</span>
-                <span id="iso-val" class="value">--</span>
-                <div class="adj-btns">
-                    <button onclick="sendCommand('ISO_DOWN')" class="btn-tonal"><svg fill="currentColor" viewBox="0 0 24 24"><path d="M19 13H5v-2h14v2z"/></svg></button>
-                    <button onclick="sendCommand('ISO_UP')" class="btn-tonal"><svg fill="currentColor" viewBox="0 0 24 24"><path d="M19 13h-6v6h-2v-6H5v-2h6V5h2v6h6v2z"/></svg></button>
-                </div>
-            </div>
-
-            <!-- Capture -->
-            <button onclick="sendCommand('CAPTURE')" class="fab-capture">
-                <svg fill="currentColor" viewBox="0 0 24 24"><path d="M9 2L7.17 4H4c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V6c0-1.1-.9-2-2-2h-3.17L15 2H9zm3 15c-2.76 0-5-2.24-5-5s2.24-5 5-5 5 2.24 5 5-2.24 5-5 5z"/><circle cx="12" cy="12" r="3"/></svg>
-            </button>
-
-            <!-- Shutter -->
-            <div class="m3-card">
-                <span class="label">Otturatore</span>
-                <span id="shutter-val" class="value">--</span>
-                <div class="adj-btns">
-                    <button onclick="sendCommand('SHUTTER_DOWN')" class="btn-tonal"><svg fill="currentColor" viewBox="0 0 24 24"><path d="M19 13H5v-2h14v2z"/></svg></button>
-                    <button onclick="sendCommand('SHUTTER_UP')" class="btn-tonal"><svg fill="currentColor" viewBox="0 0 24 24"><path d="M19 13h-6v6h-2v-6H5v-2h6V5h2v6h6v2z"/></svg></button>
-                </div>
-            </div>
-        </div>
-    </footer>
+        /* Lightbox */
+        .lightbox {
+            display: none;
+            position: fixed;
+            inset: 0;
+            background: rgba(0,0,0,0.95);
+            z-index: 1000;
+            justify-content: center;
+            align-items: center;
+            padding: 24px;
+        }
+        .lightbox.active { display: flex; }
+        .lightbox img { max-width: 100%; max-height: 100%; border-radius: 8px; }
 
+        /* Scroll sentinel: reaching it loads the next page of cards */
+        .more { grid-column: 1/-1; height: 1px; }
+"""
 
-    <script>
-        function sendCommand(cmd) {
-            fetch('/api/command', {
-                method: 'POST',
-                body: JSON.stringify({command: cmd}),
-                headers: {'Content-Type': 'application/json'}
-            });
+def minify_js(js):
+    """Drop indentation, blank lines and whole-line comments from a script"""
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith('//'))
+
+# Gallery script, served from /app.js so browsers cache it across visits
+GALLERY_JS = """
+// Elements used by the handlers below, looked up once (the script is deferred,
+// so the whole page has been parsed by the time it runs)
+const $ = id => document.getElementById(id);
+const els = {
+    normalBar: $('normal-bar'),
+    selBar: $('sel-bar'),
+    selCount: $('sel-count'),
+    bulkBar: $('bulk-bar'),
+    btnDownload: $('btn-download-sel'),
+    btnDelete: $('btn-delete-sel'),
+    lightbox: $('lightbox'),
+    lightboxImg: $('lightbox-img'),
+    powerDialog: $('power-dialog'),
+    photoCount: $('photo-count'),
+    more: $('more'),
+};
+
+// ── Dates ─────────────────────────────────────────────────────────
+// Cards carry the raw mtime; format them here in the browser's time zone
+const DATE_FMT = new Intl.DateTimeFormat('it-IT', {
+    day: '2-digit', month: 'short', year: 'numeric', hour: '2-digit', minute: '2-digit'
+});
+function formatDates(root) {
+    root.querySelectorAll('.file-date[data-ts]').forEach(n => {
+        n.textContent = DATE_FMT.format(new Date(n.dataset.ts * 1000));
+    });
+}
+formatDates(document);
+
+// ── Selection mode ────────────────────────────────────────────────
+let selectMode = false;
+const selected = new Set();
+
+// Cards by filename, looked up once instead of querying the DOM per photo
+const CARD_BY_NAME = new Map();
+document.querySelectorAll('.m3-card[data-filename]').forEach(c => CARD_BY_NAME.set(c.dataset.filename, c));
+
+function toggleSelectMode() {
+    selectMode ? exitSelectMode() : enterSelectMode();
+}
+
+function enterSelectMode() {
+    selectMode = true;
+    document.body.classList.add('select-mode');
+    els.normalBar.style.display = 'none';
+    els.selBar.classList.add('visible');
+    updateSelectionUI();
+}
+
+function exitSelectMode() {
+    selectMode = false;
+    // Only the selected cards carry the class, no need to scan the whole gallery
+    selected.forEach(name => {
+        const card = CARD_BY_NAME.get(name);
+        if (card) card.classList.remove('selected');
+    });
+    selected.clear();
+    document.body.classList.remove('select-mode');
+    els.normalBar.style.display = '';
+    els.selBar.classList.remove('visible');
+    els.bulkBar.classList.remove('visible');
+}
+
+async function selectAll() {
+    // "All" means the whole gallery, not just the pages scrolled so far
+    while (nextOffset !== null) {
+        if (!await loadMore()) {
+            alert('Impossibile caricare tutte le foto, riprova.');
+            return;
         }
-
-        function updateStatus() {
-            fetch('/api/status')
-                .then(r => r.json())
-                .then(data => {
-                    document.getElementById('iso-val').textContent = data.iso;
-                    document.getElementById('shutter-val').textContent = data.shutter;
-                    
-                    const offline = document.getElementById('offline-msg');
-                    const preview = document.getElementById('preview');
-                    const backBtn = document.querySelector('.back-container');
-                    
-                    // Show frame dimensions in the LIVE badge for diagnosis
-                    if (preview.naturalWidth > 0) {
-                        document.getElementById('res-info').textContent = `${preview.naturalWidth}x${preview.naturalHeight}`;
-                    }
-                    
-                    const isLandscape = window.matchMedia("(orientation: landscape)").matches;
-                    
-                    if (data.mode === 'remote') {
-                        offline.style.display = 'none';
-                        preview.style.opacity = 1;
-                    } else {
-                        preview.style.opacity = 0.3;
-                        offline.style.display = 'flex';
-                    }
-                    
-                    if (isLandscape) {
-                        backBtn.style.display = 'block';
-                    } else {
-                        backBtn.style.display = 'none';
-                    }
-                })
-                .catch(e => console.log('Conn error'));
+    }
+    if (!selectMode) return; // Left selection mode while the pages loaded
+    const cards = [];
+    CARD_BY_NAME.forEach((card, name) => {
+        if (!selected.has(name)) {
+            selected.add(name);
+            cards.push(card);
         }
-
-        // Cleanup when page closes
-        window.addEventListener('beforeunload', function() {
-            sendCommand('STOP_REMOTE');
+    });
+    // All class writes land in a single frame; skip cards deselected meanwhile
+    requestAnimationFrame(() => cards.forEach(card => {
+        if (selected.has(card.dataset.filename)) card.classList.add('selected');
+    }));
+    updateSelectionUI();
+}
+
+function toggleCard(card, filename) {
+    if (!selectMode) return;
+    if (selected.has(filename)) {
+        selected.delete(filename);
+        card.classList.remove('selected');
+    } else {
+        selected.add(filename);
+        card.classList.add('selected');
+    }
+    updateSelectionUI();
+}
+
+// Coalesce selection UI refreshes: fast taps cost one DOM update per frame
+let selectionUIPending = false;
+function updateSelectionUI() {
+    if (selectionUIPending) return;
+    selectionUIPending = true;
+    requestAnimationFrame(renderSelectionUI);
+}
+
+function renderSelectionUI() {
+    selectionUIPending = false;
+    const n = selected.size;
+    els.selCount.textContent = n === 1 ? '1 selezionata' : n + ' selezionate';
+    const hasAny = n > 0;
+    els.btnDownload.disabled = !hasAny;
+    els.btnDelete.disabled = !hasAny;
+    els.bulkBar.classList.toggle('visible', hasAny);
+}
+
+// ── Download ZIP ──────────────────────────────────────────────────
+async function downloadSelected() {
+    if (!selected.size) return;
+    const btn = els.btnDownload;
+    btn.disabled = true;
+    btn.textContent = 'Preparazione…';
+    try {
+        const res = await fetch('/download_zip', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({files: [...selected]})
         });
-        
-        // Also cleanup when navigating away
-        window.addEventListener('pagehide', function() {
-            sendCommand('STOP_REMOTE');
+        if (!res.ok) throw new Error('Server error');
+        const blob = await res.blob();
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        const cd = res.headers.get('Content-Disposition') || '';
+        const m = cd.match(/filename="?([^"]+)"?/);
+        a.download = m ? m[1] : 'foto.zip';
+        a.click();
+        URL.revokeObjectURL(url);
+    } catch(e) {
+        alert('Errore durante il download: ' + e.message);
+    } finally {
+        btn.disabled = false;
+        btn.innerHTML = '<svg><use href="#ic-dl"/></svg> Scarica';
+        updateSelectionUI();
+    }
+}
+
+// ── Delete selected ───────────────────────────────────────────────
+async function deleteSelected() {
+    if (!selected.size) return;
+    const n = selected.size;
+    if (!confirm('Eliminare definitivamente ' + n + ' foto?')) return;
+    const btn = els.btnDelete;
+    btn.disabled = true;
+    btn.textContent = 'Eliminazione…';
+    try {
+        const res = await fetch('/delete_multiple', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({files: [...selected]})
         });
-
-        // Heartbeats - reduced to 3s intervals for faster detection
-        sendCommand('START_REMOTE');
-        setInterval(updateStatus, 1000);
-        setInterval(() => sendCommand('HEARTBEAT'), 3000);
-    </script>
-</body>
-</html>
+        const data = await res.json();
+        const nodes = [];
+        data.deleted.forEach(name => {
+            const card = CARD_BY_NAME.get(name);
+            if (card) nodes.push(card);
+            CARD_BY_NAME.delete(name);
+            selected.delete(name);
+        });
+        // Remove every deleted card in one frame: a single layout pass
+        requestAnimationFrame(() => nodes.forEach(n => n.remove()));
+        if (data.errors.length) {
+            alert('Alcuni file non trovati: ' + data.errors.join(', '));
+        }
+        photoTotal -= data.deleted.length;
+        // Later pages shift up by the photos removed from the loaded ones
+        if (nextOffset !== null) nextOffset -= data.deleted.length;
+        els.photoCount.textContent = photoTotal + ' Scatti salvati';
+    } catch(e) {
+        alert('Errore: ' + e.message);
+    } finally {
+        btn.innerHTML = '<svg><use href="#ic-del"/></svg> Elimina';
+        exitSelectMode();
+    }
+}
+
+// ── Paging ────────────────────────────────────────────────────────
+// The server sends the newest cards only; the rest are fetched in batches
+// as the sentinel after the last card scrolls into view
+const PAGE_SIZE = %d;
+let photoTotal = Number(els.photoCount.dataset.total);
+let nextOffset = els.more ? Number(els.more.dataset.next) : null;
+let loadingMore = null;
+
+// Fetch the next page; resolves to false if it failed. Concurrent callers
+// (the scroll observer and selectAll) share the request in flight.
+function loadMore() {
+    if (!loadingMore) {
+        loadingMore = fetchMore().finally(() => { loadingMore = null; });
+    }
+    return loadingMore;
+}
+
+async function fetchMore() {
+    if (nextOffset === null) return true;
+    try {
+        const res = await fetch('/?offset=' + nextOffset + '&limit=' + PAGE_SIZE);
+        if (!res.ok) throw new Error('Server error');
+        const next = res.headers.get('X-Next-Offset');
+        nextOffset = next === null ? null : Number(next);
+        // Parse the batch off-document, then insert it with a single DOM write
+        const tpl = document.createElement('template');
+        tpl.innerHTML = await res.text();
+        tpl.content.querySelectorAll('.m3-card[data-filename]').forEach(card => {
+            const name = card.dataset.filename;
+            // Photos taken since the page loaded push older ones into this batch
+            if (CARD_BY_NAME.has(name)) card.remove();
+            else CARD_BY_NAME.set(name, card);
+        });
+        formatDates(tpl.content);
+        els.more.before(tpl.content);
+        if (nextOffset === null) {
+            moreObserver.disconnect();
+            els.more.remove();
+        } else {
+            // Observing afresh reports the current state, so a sentinel that
+            // is still in view after this batch triggers the next one
+            moreObserver.unobserve(els.more);
+            moreObserver.observe(els.more);
+        }
+        return true;
+    } catch(e) {
+        console.log('Load more failed: ' + e.message);
+        return false;
+    }
+}
+
+const moreObserver = new IntersectionObserver(entries => {
+    if (entries.some(e => e.isIntersecting)) loadMore();
+}, {rootMargin: '800px'});
+if (els.more) moreObserver.observe(els.more);
+
+// ── Lightbox ──────────────────────────────────────────────────────
+function openLightbox(src) {
+    if (selectMode) return;
+    els.lightboxImg.src = src;
+    els.lightbox.classList.add('active');
+    document.body.style.overflow = 'hidden';
+}
+function closeLightbox() {
+    els.lightbox.classList.remove('active');
+    document.body.style.overflow = 'auto';
+}
+
+// ── Power dialog ──────────────────────────────────────────────────
+function openPowerDialog() {
+    els.powerDialog.classList.add('open');
+}
+function closePowerDialog(e) {
+    if (!e || e.target === els.powerDialog)
+        els.powerDialog.classList.remove('open');
+}
+
+async function systemReboot() {
+    if (!confirm('Riavviare il Raspberry Pi?')) return;
+    closePowerDialog();
+    await fetch('/system/reboot', {method: 'POST'});
+    alert('Riavvio in corso… la pagina non risponderà per qualche minuto.');
+}
+
+async function systemShutdown() {
+    if (!confirm('Spegnere il Raspberry Pi?')) return;
+    closePowerDialog();
+    await fetch('/system/shutdown', {method: 'POST'});
+    alert('Spegnimento in corso…');
+}
 """
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
 
-    def list_directory(self, path):
-        """Override to show a beautiful Material Design 3 photo gallery"""
-        try:
-            photos = sorted(PHOTOS_DIR.glob("*.jpg"), reverse=True)
-        except OSError:
-            self.send_error(404, "Cannot list directory")
-            return None
-        
-        try:
-            result = subprocess.run(['hostname', '-I'], capture_output=True, text=True, timeout=3)
-            ip_address = result.stdout.strip().split()[0]
-        except Exception:
-            ip_address = 'localhost'
-        
-        photo_count = len(photos)
-        
-        html = f"""
+GALLERY_JS_BYTES = minify_js(GALLERY_JS % GALLERY_PAGE_SIZE).encode('utf-8')
+GALLERY_JS_GZ = gzip.compress(GALLERY_JS_BYTES, mtime=0)
+# Content hash in the script URL, so it can be cached forever yet never go stale
+GALLERY_JS_VERSION = hashlib.sha1(GALLERY_JS_BYTES).hexdigest()[:12]
+
+GALLERY_CSS_BYTES = minify_css(GALLERY_CSS).encode('utf-8')
+GALLERY_CSS_GZ = gzip.compress(GALLERY_CSS_BYTES, mtime=0)
+GALLERY_CSS_VERSION = hashlib.sha1(GALLERY_CSS_BYTES).hexdigest()[:12]
+
+# Gallery page shell, encoded once at import; only the info banner changes per request
+GALLERY_HEAD = ("""
 <!DOCTYPE html>
 <html lang="it">
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Galleria | Pi Camera</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:ital,opsz,wght@0,14..32,100..900;1,14..32,100..900&display=swap" rel="stylesheet">
-    <style>
-        :root {{
-            --m3-surface: #1C1B1F;
-            --m3-on-surface: #E6E1E5;
-            --m3-surface-container: #2B2930;
-            --m3-primary: #D0BCFF;
-            --m3-on-primary: #381E72;
-            --m3-secondary-container: #4A4458;
-            --m3-on-secondary-container: #E8DEF8;
-            --m3-outline: #938F99;
-            --m3-error: #F2B8B5;
-            --m3-error-container: #8C1D18;
-        }}
-        
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        
-        body {{
-            font-family: 'Inter', sans-serif;
-            background: var(--m3-surface);
-            color: var(--m3-on-surface);
-            min-height: 100vh;
-            padding-bottom: 120px;
-        }}
+    <link rel="stylesheet" href="/app.css?v=""" + GALLERY_CSS_VERSION + """">
+</head>
+<body>
+    <!-- Icons shared by every card, referenced with <use> -->
+    <svg style="display:none">
+        <symbol id="ic-dl" viewBox="0 0 24 24"><path d="M19 9h-4V3H9v6H5l7 7 7-7zM5 18v2h14v-2H5z"/></symbol>
+        <symbol id="ic-del" viewBox="0 0 24 24"><path d="M6 19c0 1.1.9 2 2 2h8c1.1 0 2-.9 2-2V7H6v12zM19 4h-3.5l-1-1h-5l-1 1H5v2h14V4z"/></symbol>
+        <symbol id="ic-check" viewBox="0 0 24 24"><path d="M9 16.2L4.8 12l-1.4 1.4L9 19 21 7l-1.4-1.4L9 16.2z"/></symbol>
+    </svg>
+    <!-- Normal app bar -->
+    <header class="app-bar" id="normal-bar">
+        <h1 class="app-title">Galleria</h1>
+        <button class="icon-btn" onclick="toggleSelectMode()" id="select-btn" title="Seleziona foto">
+            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M3 5h2V3c-1.1 0-2 .9-2 2zm0 8h2v-2H3v2zm4 8h2v-2H7v2zm-4-4h2v-2H3v2zm10-16H7v2h6V1zm6 0v2h2c0-1.1-.9-2-2-2zm-6 20h2v-2h-2v2zm-4-8h8V7H9v8zm2-6h4v4h-4V9zm8 12v-2h2v-2h-2v-2h-2v2h-2v2h2v2h2zm0-8h2v-2h-2v2zM3 17h2v-2H3v2zm14 0h2v-2h-2v2zm-4-14h-2v2h2V3z"/></svg>
+        </button>
+        <button class="icon-btn error" onclick="openPowerDialog()" title="Alimentazione">
+            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M13 3h-2v10h2V3zm4.83 2.17l-1.42 1.42C17.99 7.86 19 9.81 19 12c0 3.87-3.13 7-7 7s-7-3.13-7-7c0-2.19 1.01-4.14 2.58-5.42L6.17 5.17C4.23 6.82 3 9.26 3 12c0 4.97 4.03 9 9 9s9-4.03 9-9c0-2.74-1.23-5.18-3.17-6.83z"/></svg>
+        </button>
+    </header>
 
-        /* App Bar */
-        .app-bar {{
-            height: 64px;
-            display: flex;
-            align-items: center;
-            padding: 0 4px 0 16px;
-            position: sticky;
-            top: 0;
-            background: var(--m3-surface);
-            z-index: 10;
-            gap: 4px;
-        }}
+    <!-- Selection mode app bar -->
+    <header class="sel-bar" id="sel-bar">
+        <button class="icon-btn" onclick="exitSelectMode()" title="Chiudi selezione">
+            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/></svg>
+        </button>
+        <span class="sel-count" id="sel-count">0 selezionate</span>
+        <button class="icon-btn" onclick="selectAll()" title="Seleziona tutte">
+            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M18 7l-1.41-1.41-6.34 6.34-2.83-2.83L6 10.5l4.24 4.24L18 7zm-11.5 9H4v3h3v-2H5v-1zM4 7h3V4H4v3zm0 5h3v-3H4v3zm4 5h3v-3H8v3zm5 0h3v-3h-3v3z"/></svg>
+        </button>
+    </header>
 
-        .app-title {{ font-size: 22px; font-weight: 400; flex: 1; }}
+""").encode('utf-8')
 
-        .icon-btn {{
-            background: transparent;
-            border: none;
-            color: var(--m3-on-surface);
-            width: 48px;
-            height: 48px;
-            border-radius: 50%;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            flex-shrink: 0;
-            transition: background 0.15s;
-        }}
-        .icon-btn:hover {{ background: rgba(255,255,255,0.08); }}
-        .icon-btn.active {{ background: rgba(208,188,255,0.15); color: var(--m3-primary); }}
-        .icon-btn.error {{ color: var(--m3-error); }}
-        .icon-btn svg {{ width: 24px; height: 24px; }}
+GALLERY_INFO = b"""    <div class="info-header">
+        <span id="photo-count" data-total="%b">%b Scatti salvati</span>
+        <span style="font-size: 12px; color: var(--m3-outline);">http://%b:8080</span>
+    </div>
 
-        /* Selection mode app bar */
-        .sel-bar {{
-            display: none;
-            height: 64px;
-            align-items: center;
-            padding: 0 8px;
-            position: sticky;
-            top: 0;
-            background: var(--m3-secondary-container);
-            z-index: 10;
-            gap: 4px;
-        }}
-        .sel-bar.visible {{ display: flex; }}
-        .sel-count {{ flex: 1; font-size: 18px; font-weight: 500; padding-left: 8px; color: var(--m3-on-secondary-container); }}
+    <main class="gallery">
+"""
 
-        /* Info Banner */
-        .info-header {{
-            padding: 12px 16px;
-            background: var(--m3-surface-container);
-            margin: 16px;
-            border-radius: 16px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            font-size: 14px;
-            color: var(--m3-on-secondary-container);
-        }}
+GALLERY_HEAD_GZ = deflate_piece(GALLERY_HEAD)
 
-        .gallery {{
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
-            gap: 16px;
-            padding: 16px;
-        }}
+GALLERY_EMPTY = """<div style="grid-column: 1/-1; text-align: center; padding: 64px; color: var(--m3-outline)">
+                <svg width="64" height="64" fill="currentColor" viewBox="0 0 24 24"><path d="M22 16V4c0-1.1-.9-2-2-2H8c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h12c1.1 0 2-.9 2-2zm-11-4l2.03 2.71L16 11l4 5H8l3-4zM2 6v14c0 1.1.9 2 2 2h14v-2H4V6H2z"/></svg>
+                <p style="margin-top: 16px">Nessuna foto trovata</p>
+            </div>""".encode('utf-8')
 
-        /* Card */
-        .m3-card {{
-            background: var(--m3-surface-container);
-            border-radius: 12px;
-            overflow: hidden;
-            display: flex;
-            flex-direction: column;
-            transition: transform 0.15s, outline 0.15s;
-            position: relative;
-        }}
-        .m3-card.selected {{
-            outline: 3px solid var(--m3-primary);
-        }}
+GALLERY_TAIL = ("""
+    </main>
 
-        /* Checkbox overlay */
-        .card-check {{
-            position: absolute;
-            top: 10px;
-            left: 10px;
-            width: 28px;
-            height: 28px;
-            border-radius: 50%;
-            background: rgba(0,0,0,0.55);
-            border: 2px solid rgba(255,255,255,0.8);
-            display: none;
-            align-items: center;
-            justify-content: center;
-            cursor: pointer;
-            z-index: 2;
-            transition: background 0.15s, border-color 0.15s;
-        }}
-        .card-check svg {{ width: 16px; height: 16px; fill: white; display: none; }}
-        .m3-card.selected .card-check {{
-            background: var(--m3-primary);
-            border-color: var(--m3-primary);
-        }}
-        .m3-card.selected .card-check svg {{ display: block; }}
-        body.select-mode .card-check {{ display: flex; }}
-        body.select-mode .m3-card img {{ cursor: default; }}
+    <a href="/live" class="fab" id="live-fab">
+        <svg fill="currentColor" viewBox="0 0 24 24" width="24" height="24"><path d="M17 10.5V7c0-.55-.45-1-1-1H4c-.55 0-1 .45-1 1v10c0 .55.45 1 1 1h12c.55 0 1-.45 1-1v-3.5l4 4v-11l-4 4z"/></svg>
+        LIVE
+    </a>
 
-        .m3-card img {{
-            width: 100%;
-            height: 200px;
-            object-fit: cover;
-            cursor: pointer;
-            display: block;
-        }}
+    <!-- Bulk action bar -->
+    <div class="bulk-bar" id="bulk-bar">
+        <button class="bulk-btn download" id="btn-download-sel" onclick="downloadSelected()" disabled>
+            <svg><use href="#ic-dl"/></svg>
+            Scarica
+        </button>
+        <button class="bulk-btn del" id="btn-delete-sel" onclick="deleteSelected()" disabled>
+            <svg><use href="#ic-del"/></svg>
+            Elimina
+        </button>
+    </div>
 
-        .card-content {{ padding: 12px; flex: 1; }}
-        .file-name {{ font-size: 14px; font-weight: 500; margin-bottom: 4px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }}
-        .file-date {{ font-size: 12px; color: var(--m3-outline); }}
+    <!-- Lightbox -->
+    <div id="lightbox" class="lightbox" onclick="closeLightbox()">
+        <svg style="position: absolute; top: 24px; right: 24px; cursor: pointer;" width="32" height="32" fill="white" viewBox="0 0 24 24"><path d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/></svg>
+        <img id="lightbox-img" src="">
+    </div>
 
-        .card-actions {{
-            padding: 8px;
+    <!-- Power dialog -->
+    <div class="dialog-backdrop" id="power-dialog" onclick="closePowerDialog(event)">
+        <div class="power-dialog">
+            <div class="dialog-title">Alimentazione</div>
+            <button class="power-option reboot" onclick="systemReboot()">
+                <svg viewBox="0 0 24 24"><path d="M12 5V1L7 6l5 5V7c3.31 0 6 2.69 6 6s-2.69 6-6 6-6-2.69-6-6H4c0 4.42 3.58 8 8 8s8-3.58 8-8-3.58-8-8-8z"/></svg>
+                <div class="power-option-label">
+                    Riavvia
+                    <span>Il Raspberry Pi si riavvierà</span>
+                </div>
+            </button>
+            <button class="power-option shutdown" onclick="systemShutdown()">
+                <svg viewBox="0 0 24 24"><path d="M13 3h-2v10h2V3zm4.83 2.17l-1.42 1.42C17.99 7.86 19 9.81 19 12c0 3.87-3.13 7-7 7s-7-3.13-7-7c0-2.19 1.01-4.14 2.58-5.42L6.17 5.17C4.23 6.82 3 9.26 3 12c0 4.97 4.03 9 9 9s9-4.03 9-9c0-2.74-1.23-5.18-3.17-6.83z"/></svg>
+                <div class="power-option-label">
+                    Spegni
+                    <span>Il Raspberry Pi si spegnerà</span>
+                </div>
+            </button>
+            <button class="dialog-cancel" onclick="closePowerDialog()">Annulla</button>
+        </div>
+    </div>
+
+    <script src="/app.js?v=%s" defer></script>
+</body>
+</html>
+""" % GALLERY_JS_VERSION).encode('utf-8')
+
+GALLERY_EMPTY_GZ = deflate_piece(GALLERY_EMPTY)
+GALLERY_TAIL_GZ = deflate_piece(GALLERY_TAIL)
+
+# Gallery card markup, filled with str.format once per photo version
+CARD_TMPL = """
+        <div class="m3-card" data-filename="{name_html}" onclick="toggleCard(this, '{name_js}')">
+            <div class="card-check">
+                <svg><use href="#ic-check"/></svg>
+            </div>
+            <img src="{thumb_src}"{srcset} onclick="if(!selectMode){{openLightbox('{photo_url}');}} event.stopPropagation();" loading="lazy" decoding="async">
+            <div class="card-content">
+                <div class="file-name">{name_html}</div>
+                <div class="file-date" data-ts="{timestamp}"></div>
+            </div>
+            <div class="card-actions">
+                <a href="{photo_url}" download="{name_html}" class="text-btn" onclick="event.stopPropagation()">
+                    <svg fill="currentColor" width="18" height="18"><use href="#ic-dl"/></svg>
+                    Scarica
+                </a>
+                <form action="/delete/{name_url}" method="post" style="display:contents" onsubmit="return confirm('Eliminare definitivamente questa foto?');" onclick="event.stopPropagation()">
+                    <button type="submit" class="text-btn delete">
+                        <svg fill="currentColor" width="18" height="18"><use href="#ic-del"/></svg>
+                        Elimina
+                    </button>
+                </form>
+            </div>
+        </div>
+"""
+
+# Rendered cards: filename -> (mtime, html bytes, deflated html bytes)
+_card_lock = threading.Lock()
+_CARD_CACHE = {}
+
+# Sorted (filename, mtime) list, valid while the directory mtime is unchanged
+_listing_lock = threading.Lock()
+_listing_cache = {'dir_mtime': None, 'photos': []}
+
+_ip_cache = {'address': 'localhost', 'expires': 0.0}
+
+def render_card(filename, timestamp):
+    """Render one gallery card as (html bytes, deflated html bytes).
+    The name is escaped once here for each context it appears in."""
+    name_html = html_escape(filename)
+    # JS string literal inside an HTML attribute: escape for JS, then for HTML
+    name_js = html_escape(filename.replace('\\', '\\\\').replace("'", "\\'"))
+    name_url = urllib.parse.quote(filename)
+    # The mtime in every image URL lets them be cached for good: a photo
+    # overwritten under the same name gets new URLs (and a new cached card)
+    version = f"?v={int(timestamp * 1e6):x}"
+    photo_url = f"/{name_url}{version}"
+    if PIL_AVAILABLE:
+        thumb_src = f"/thumbs/{THUMB_WIDTHS[0]}/{name_url}{version}"
+        srcset = ' srcset="{}" sizes="(max-width: 600px) 100vw, 400px"'.format(
+            ", ".join(f"/thumbs/{w}/{name_url}{version} {w}w" for w in THUMB_WIDTHS))
+    else:
+        thumb_src = photo_url
+        srcset = ""
+    html = CARD_TMPL.format(name_html=name_html, name_js=name_js, name_url=name_url,
+                            photo_url=photo_url, thumb_src=thumb_src, srcset=srcset,
+                            timestamp=int(timestamp)).encode('utf-8')
+    return html, deflate_piece(html)
+
+def get_cards(photos):
+    """Return the (html, deflated) card for each (filename, mtime) in photos,
+    rendering only photos that are new or changed since they were cached"""
+    cards = []
+    with _card_lock:
+        for name, mtime in photos:
+            cached = _CARD_CACHE.get(name)
+            if cached is None or cached[0] != mtime:
+                cached = _CARD_CACHE[name] = (mtime, *render_card(name, mtime))
+            cards.append(cached[1:])
+    return cards
+
+def list_photos():
+    """Return (filename, mtime) for every photo, most recently taken first.
+    The directory is only rescanned after a photo was added or removed.
+
+    This relies on photos appearing atomically (written elsewhere, then
+    renamed in, as camera_app does): a file written in place after its
+    name appeared would keep its stale cached mtime, and with it the
+    ?v= version its immutable URLs are cached under."""
+    dir_mtime = os.stat(PHOTOS_DIR_STR).st_mtime_ns
+    with _listing_lock:
+        if dir_mtime != _listing_cache['dir_mtime']:
+            # One stat() per photo, and only after the directory changed; the
+            # name filter runs on readdir data before any stat is made
+            photos = []
+            with os.scandir(PHOTOS_DIR_STR) as it:
+                for e in it:
+                    if not e.name.endswith('.jpg') or e.name.startswith('.'):
+                        continue
+                    try:
+                        photos.append((e.name, e.stat().st_mtime))
+                    except FileNotFoundError:
+                        pass # Deleted since readdir (e.g. a bulk delete in progress)
+            # Newest capture first; the name breaks ties between same-second shots
+            photos.sort(key=lambda p: (p[1], p[0]), reverse=True)
+            _listing_cache['dir_mtime'] = dir_mtime
+            _listing_cache['photos'] = photos
+
+            # Forget cards of deleted photos
+            with _card_lock:
+                for name in _CARD_CACHE.keys() - {name for name, _ in photos}:
+                    del _CARD_CACHE[name]
+        return _listing_cache['photos']
+
+def get_ip_address():
+    """Return the Pi's LAN address, refreshed at most every IP_CACHE_TTL seconds"""
+    now = time.monotonic()
+    if now >= _ip_cache['expires']:
+        try:
+            result = subprocess.run(['hostname', '-I'], capture_output=True, text=True, timeout=3)
+            _ip_cache['address'] = result.stdout.strip().split()[0]
+        except Exception:
+            _ip_cache['address'] = 'localhost'
+        _ip_cache['expires'] = now + IP_CACHE_TTL
+    return _ip_cache['address']
+
+# Live Control stylesheet, served minified from /live.css
+LIVE_CSS = """
+        :root {
+            --m3-surface: #121212;
+            --m3-on-surface: #E6E1E5;
+            --m3-primary: #D0BCFF;
+            --m3-on-primary: #381E72;
+            --m3-secondary: #CCC2DC;
+            --m3-surface-variant: #49454F;
+            --m3-on-surface-variant: #CAC4D0;
+            --m3-outline: #938F99;
+        }
+
+        body { 
+            font-family: system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif;
+            background: var(--m3-surface); 
+            color: var(--m3-on-surface); 
+            margin: 0;
+            padding: 0;
+            position: fixed;
+            top: 0;
+            left: 0;
+            right: 0;
+            bottom: 0;
+            overflow: hidden;
+        }
+
+        /* Top App Bar */
+        .app-bar {
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            height: 64px;
             display: flex;
-            justify-content: flex-end;
-            gap: 8px;
-            border-top: 1px solid rgba(255,255,255,0.05);
-        }}
-        body.select-mode .card-actions {{ display: none; }}
+            align-items: center;
+            padding: 0 16px;
+            box-sizing: border-box;
+            background: var(--m3-surface);
+            z-index: 100;
+        }
 
-        .text-btn {{
+        .icon-btn {
             background: transparent;
             border: none;
-            color: var(--m3-primary);
-            padding: 8px 12px;
-            border-radius: 8px;
-            font-weight: 500;
-            font-size: 14px;
+            color: var(--m3-on-surface);
+            width: 48px;
+            height: 48px;
+            border-radius: 50%;
             cursor: pointer;
-            text-decoration: none;
             display: flex;
             align-items: center;
-            gap: 6px;
-        }}
-        .text-btn.delete {{ color: var(--m3-error); }}
-        .text-btn:hover {{ background: rgba(208, 188, 255, 0.08); }}
-        .text-btn.delete:hover {{ background: rgba(242, 184, 181, 0.08); }}
+            justify-content: center;
+            transition: background 0.2s;
+            text-decoration: none;
+        }
+        .icon-btn:active { background: rgba(255,255,255,0.1); }
+        .icon-btn svg { width: 24px; height: 24px; }
+        .btn-tonal svg { width: 18px; height: 18px; }
+        .fab-capture svg { width: 36px; height: 36px; }
+        
+        .app-title {
+            margin-left: 8px;
+            font-size: 22px;
+            font-weight: 400;
+        }
 
-        /* Bulk action bar */
-        .bulk-bar {{
-            display: none;
-            position: fixed;
-            bottom: 0;
+        /* Preview Container */
+        .preview-wrapper {
+            position: absolute;
+            top: 64px; /* below app bar */
+            bottom: 120px; /* above control panel */
             left: 0;
             right: 0;
-            height: 80px;
-            background: var(--m3-secondary-container);
+            display: flex;
             align-items: center;
             justify-content: center;
-            gap: 12px;
-            z-index: 200;
-            padding: 0 24px;
-            box-shadow: 0 -4px 16px rgba(0,0,0,0.4);
-        }}
-        .bulk-bar.visible {{ display: flex; }}
+            background: #000;
+            z-index: 1;
+        }
 
-        .bulk-btn {{
-            height: 48px;
-            padding: 0 24px;
-            border-radius: 24px;
-            border: none;
-            font-size: 15px;
-            font-weight: 600;
-            cursor: pointer;
+        #preview { 
+            max-width: 100%; 
+            max-height: 100%; 
+            object-fit: contain; 
+            background: #111;
+            width: 100%;
+            height: 100%;
+        }
+
+        .status-overlay {
+            position: absolute;
+            top: 16px;
+            right: 16px;
+            background: rgba(0,0,0,0.5);
+            padding: 4px 12px;
+            border-radius: 16px;
+            font-size: 12px;
             display: flex;
             align-items: center;
             gap: 8px;
-            transition: transform 0.1s, opacity 0.1s;
-        }}
-        .bulk-btn:active {{ transform: scale(0.97); }}
-        .bulk-btn.download {{ background: var(--m3-primary); color: var(--m3-on-primary); }}
-        .bulk-btn.del {{ background: var(--m3-error-container); color: var(--m3-error); }}
-        .bulk-btn svg {{ width: 20px; height: 20px; fill: currentColor; }}
-        .bulk-btn:disabled {{ opacity: 0.4; cursor: not-allowed; }}
+            backdrop-filter: blur(4px);
+        }
 
-        /* FAB */
-        .fab {{
-            position: fixed;
-            bottom: 24px;
-            right: 24px;
-            height: 56px;
-            padding: 0 24px;
-            border-radius: 16px;
-            background: var(--m3-primary);
-            color: var(--m3-on-primary);
+        .pulse {
+            width: 8px;
+            height: 8px;
+            background: #ff5252;
+            border-radius: 50%;
+            animation: pulse 1.5s infinite;
+        }
+        @keyframes pulse {
+            0% { transform: scale(1); opacity: 1; }
+            50% { transform: scale(1.5); opacity: 0.5; }
+            100% { transform: scale(1); opacity: 1; }
+        }
+
+        /* Bottom Control Panel */
+        .control-panel {
+            position: absolute;
+            bottom: 0;
+            left: 0;
+            right: 0;
+            background: #1C1B1F;
+            /* Extra padding to lift controls above the mobile swipe bar / nav bar */
+            padding: 16px 8px calc(24px + env(safe-area-inset-bottom, 0px)) 8px;
+            box-sizing: border-box;
+            border-radius: 28px 28px 0 0;
             display: flex;
-            align-items: center;
-            gap: 12px;
-            text-decoration: none;
-            font-weight: 500;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.3);
-            transition: box-shadow 0.2s, transform 0.2s;
-            z-index: 100;
-        }}
-        .fab:active {{ transform: scale(0.95); }}
-        body.select-mode .fab {{ display: none; }}
+            flex-direction: column;
+            gap: 16px;
+            box-shadow: 0 -4px 12px rgba(0,0,0,0.3);
+            z-index: 10;
+        }
 
-        /* Power dialog */
-        .dialog-backdrop {{
-            display: none;
-            position: fixed;
-            inset: 0;
-            background: rgba(0,0,0,0.6);
-            z-index: 500;
-            align-items: flex-end;
-            justify-content: center;
-            padding: 24px;
-        }}
-        .dialog-backdrop.open {{ display: flex; }}
-        .power-dialog {{
-            background: #2B2930;
-            border-radius: 28px;
-            padding: 24px;
+        .controls-row {
+            display: grid;
+            grid-template-columns: 1fr auto 1fr;
+            align-items: center;
+            gap: 8px;
             width: 100%;
-            max-width: 360px;
+        }
+
+        .m3-card {
+            background: var(--m3-surface-variant);
+            border-radius: 12px;
+            padding: 8px 4px;
             display: flex;
             flex-direction: column;
-            gap: 12px;
-            margin-bottom: env(safe-area-inset-bottom, 0);
-        }}
-        .dialog-title {{
-            font-size: 18px;
-            font-weight: 600;
-            text-align: center;
-            padding-bottom: 8px;
-            color: var(--m3-on-surface);
-        }}
-        .power-option {{
-            display: flex;
             align-items: center;
-            gap: 16px;
-            padding: 16px;
-            border-radius: 16px;
-            background: var(--m3-surface-container);
-            border: none;
-            color: var(--m3-on-surface);
-            cursor: pointer;
+            gap: 4px;
+            min-width: 0;
+        }
+
+        .label {
+            font-size: 10px;
+            font-weight: 500;
+            color: var(--m3-on-surface-variant);
+            letter-spacing: 0.5px;
+            text-transform: uppercase;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            max-width: 100%;
+        }
+
+        .value {
             font-size: 16px;
             font-weight: 500;
-            font-family: inherit;
-            transition: background 0.15s;
-        }}
-        .power-option:hover {{ background: #3B3940; }}
-        .power-option svg {{ width: 28px; height: 28px; flex-shrink: 0; }}
-        .power-option.reboot svg {{ fill: #A8C7FA; }}
-        .power-option.shutdown svg {{ fill: var(--m3-error); }}
-        .power-option-label {{ text-align: left; }}
-        .power-option-label span {{ display: block; font-size: 12px; color: var(--m3-outline); font-weight: 400; margin-top: 2px; }}
-        .dialog-cancel {{
-            background: transparent;
-            border: 1px solid rgba(255,255,255,0.12);
             color: var(--m3-on-surface);
-            border-radius: 12px;
-            padding: 14px;
-            font-size: 15px;
-            font-family: inherit;
-            cursor: pointer;
-            margin-top: 4px;
-            transition: background 0.15s;
-        }}
-        .dialog-cancel:hover {{ background: rgba(255,255,255,0.06); }}
+            min-width: 40px;
+            text-align: center;
+        }
 
-        /* Lightbox */
-        .lightbox {{
-            display: none;
-            position: fixed;
-            inset: 0;
-            background: rgba(0,0,0,0.95);
-            z-index: 1000;
+        .adj-btns { display: flex; gap: 4px; }
+
+        .btn-tonal {
+            background: var(--m3-secondary);
+            color: var(--m3-on-primary);
+            border: none;
+            height: 32px;
+            width: 32px;
+            border-radius: 8px;
+            cursor: pointer;
+            display: flex;
+            align-items: center;
             justify-content: center;
+        }
+
+        /* Capture Button - Rounded & Broken (Circle) */
+        .fab-capture {
+            width: 72px;
+            height: 72px;
+            border-radius: 50%;
+            background: var(--m3-primary);
+            color: var(--m3-on-primary);
+            border: none;
+            cursor: pointer;
+            display: flex;
             align-items: center;
-            padding: 24px;
-        }}
-        .lightbox.active {{ display: flex; }}
-        .lightbox img {{ max-width: 100%; max-height: 100%; border-radius: 8px; }}
-    </style>
-</head>
-<body>
-    <!-- Normal app bar -->
-    <header class="app-bar" id="normal-bar">
-        <h1 class="app-title">Galleria</h1>
-        <button class="icon-btn" onclick="toggleSelectMode()" id="select-btn" title="Seleziona foto">
-            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M3 5h2V3c-1.1 0-2 .9-2 2zm0 8h2v-2H3v2zm4 8h2v-2H7v2zm-4-4h2v-2H3v2zm10-16H7v2h6V1zm6 0v2h2c0-1.1-.9-2-2-2zm-6 20h2v-2h-2v2zm-4-8h8V7H9v8zm2-6h4v4h-4V9zm8 12v-2h2v-2h-2v-2h-2v2h-2v2h2v2h2zm0-8h2v-2h-2v2zM3 17h2v-2H3v2zm14 0h2v-2h-2v2zm-4-14h-2v2h2V3z"/></svg>
-        </button>
-        <button class="icon-btn error" onclick="openPowerDialog()" title="Alimentazione">
-            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M13 3h-2v10h2V3zm4.83 2.17l-1.42 1.42C17.99 7.86 19 9.81 19 12c0 3.87-3.13 7-7 7s-7-3.13-7-7c0-2.19 1.01-4.14 2.58-5.42L6.17 5.17C4.23 6.82 3 9.26 3 12c0 4.97 4.03 9 9 9s9-4.03 9-9c0-2.74-1.23-5.18-3.17-6.83z"/></svg>
-        </button>
-    </header>
+            justify-content: center;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.4);
+            transition: transform 0.1s, box-shadow 0.2s;
+            margin: 0 4px;
+        }
+        .fab-capture:active { transform: scale(0.95); }
 
-    <!-- Selection mode app bar -->
-    <header class="sel-bar" id="sel-bar">
-        <button class="icon-btn" onclick="exitSelectMode()" title="Chiudi selezione">
-            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/></svg>
-        </button>
-        <span class="sel-count" id="sel-count">0 selezionate</span>
-        <button class="icon-btn" onclick="selectAll()" title="Seleziona tutte">
-            <svg viewBox="0 0 24 24"><path fill="currentColor" d="M18 7l-1.41-1.41-6.34 6.34-2.83-2.83L6 10.5l4.24 4.24L18 7zm-11.5 9H4v3h3v-2H5v-1zM4 7h3V4H4v3zm0 5h3v-3H4v3zm4 5h3v-3H8v3zm5 0h3v-3h-3v3z"/></svg>
-        </button>
-    </header>
+        /* LANDSCAPE MODE & DESKTOP (Direct UI update) */
+        @media (min-width: 600px), (orientation: landscape) {
+            .app-bar { display: none !important; }
+            .preview-wrapper { 
+                position: fixed; 
+                inset: 0; 
+                z-index: 1; 
+                height: 100vh;
+                width: 100vw;
+                background: #000;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+            }
+            #preview { 
+                max-width: 100%; 
+                max-height: 100%; 
+                width: 100%;
+                height: 100%;
+                object-fit: contain; 
+            }
+            
+            .control-panel {
+                position: fixed;
+                bottom: 16px;
+                left: 50%;
+                transform: translateX(-50%);
+                width: auto;
+                min-width: 0;
+                max-width: 95vw;
+                border-radius: 40px;
+                padding: 12px 24px;
+                background: rgba(28, 27, 31, 0.85);
+                backdrop-filter: blur(16px);
+                border: 1px solid rgba(255,255,255,0.15);
+                gap: 16px;
+                z-index: 100;
+                
+                /* Fix alignment with flexbox */
+                display: flex !important;
+                flex-direction: row !important;
+                align-items: center;
+                justify-content: center;
+                overflow-x: auto;
+            }
+            
+            .controls-row { 
+                display: flex !important;
+                flex-direction: row;
+                align-items: center;
+                justify-content: center;
+                gap: 16px;
+            }
+            
+            .m3-card { 
+                background: transparent; 
+                padding: 0; 
+                border: none; 
+                box-shadow: none;
+                min-width: auto;
+                display: flex;
+                flex-direction: column;
+                align-items: center;
+                gap: 8px;
+            }
+            
+            .fab-capture { 
+                width: 64px; 
+                height: 64px; 
+                flex-shrink: 0;
+            }
+            
+            .label { display: none; }
+            .value { font-size: 14px; min-width: auto; }
+            
+            /* Persistent Float Back */
+            .back-container {
+                position: fixed;
+                top: 16px;
+                left: 16px;
+                z-index: 1000;
+                display: block !important;
+            }
+        }
 
-    <div class="info-header">
-        <span>{photo_count} Scatti salvati</span>
-        <span style="font-size: 12px; color: var(--m3-outline);">http://{ip_address}:8080</span>
-    </div>
+        .offline-overlay {
+            position: absolute;
+            inset: 0;
+            background: rgba(0,0,0,0.8);
+            display: none;
+            flex-direction: column;
+            align-items: center;
+            justify-content: center;
+            gap: 16px;
+            z-index: 5;
+        }
 
-    <main class="gallery">
-"""
-        if not photos:
-            html += """<div style="grid-column: 1/-1; text-align: center; padding: 64px; color: var(--m3-outline)">
-                <svg width="64" height="64" fill="currentColor" viewBox="0 0 24 24"><path d="M22 16V4c0-1.1-.9-2-2-2H8c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h12c1.1 0 2-.9 2-2zm-11-4l2.03 2.71L16 11l4 5H8l3-4zM2 6v14c0 1.1.9 2 2 2h14v-2H4V6H2z"/></svg>
-                <p style="margin-top: 16px">Nessuna foto trovata</p>
-            </div>"""
-        else:
-            for photo in photos:
-                filename = photo.name
-                timestamp = os.path.getmtime(photo)
-                date_str = datetime.datetime.fromtimestamp(timestamp).strftime('%d %b %Y, %H:%M')
-                
-                html += f"""
-        <div class="m3-card" data-filename="{filename}" onclick="toggleCard(this, '{filename}')">
-            <div class="card-check">
-                <svg viewBox="0 0 24 24"><path d="M9 16.2L4.8 12l-1.4 1.4L9 19 21 7l-1.4-1.4L9 16.2z"/></svg>
-            </div>
-            <img src="/{filename}" onclick="if(!selectMode){{openLightbox('/{filename}');}} event.stopPropagation();" loading="lazy">
-            <div class="card-content">
-                <div class="file-name">{filename}</div>
-                <div class="file-date">{date_str}</div>
-            </div>
-            <div class="card-actions">
-                <a href="/{filename}" download class="text-btn" onclick="event.stopPropagation()">
-                    <svg fill="currentColor" viewBox="0 0 24 24" width="18" height="18"><path d="M19 9h-4V3H9v6H5l7 7 7-7zM5 18v2h14v-2H5z"/></svg>
-                    Scarica
-                </a>
-                <form action="/delete/{filename}" method="post" style="display:contents" onsubmit="return confirm('Eliminare definitivamente questa foto?');" onclick="event.stopPropagation()">
-                    <button type="submit" class="text-btn delete">
-                        <svg fill="currentColor" viewBox="0 0 24 24" width="18" height="18"><path d="M6 19c0 1.1.9 2 2 2h8c1.1 0 2-.9 2-2V7H6v12zM19 4h-3.5l-1-1h-5l-1 1H5v2h14V4z"/></svg>
-                        Elimina
-                    </button>
-                </form>
-            </div>
-        </div>
+        .back-container { display: none; }
 """
 
-        html += f"""
-    </main>
+LIVE_CSS_BYTES = minify_css(LIVE_CSS).encode('utf-8')
+LIVE_CSS_GZ = gzip.compress(LIVE_CSS_BYTES, mtime=0)
+LIVE_CSS_VERSION = hashlib.sha1(LIVE_CSS_BYTES).hexdigest()[:12]
 
-    <a href="/live" class="fab" id="live-fab">
-        <svg fill="currentColor" viewBox="0 0 24 24" width="24" height="24"><path d="M17 10.5V7c0-.55-.45-1-1-1H4c-.55 0-1 .45-1 1v10c0 .55.45 1 1 1h12c.55 0 1-.45 1-1v-3.5l4 4v-11l-4 4z"/></svg>
-        LIVE
-    </a>
-
-    <!-- Bulk action bar -->
-    <div class="bulk-bar" id="bulk-bar">
-        <button class="bulk-btn download" id="btn-download-sel" onclick="downloadSelected()" disabled>
-            <svg viewBox="0 0 24 24"><path d="M19 9h-4V3H9v6H5l7 7 7-7zM5 18v2h14v-2H5z"/></svg>
-            Scarica
-        </button>
-        <button class="bulk-btn del" id="btn-delete-sel" onclick="deleteSelected()" disabled>
-            <svg viewBox="0 0 24 24"><path d="M6 19c0 1.1.9 2 2 2h8c1.1 0 2-.9 2-2V7H6v12zM19 4h-3.5l-1-1h-5l-1 1H5v2h14V4z"/></svg>
-            Elimina
-        </button>
-    </div>
+# Live Control page, static so it is encoded once at import
+LIVE_HTML = ("""
+<!DOCTYPE html>
+<html lang="it">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+    <title>Live Control | Pi Camera</title>
+    <link rel="stylesheet" href="/live.css?v=""" + LIVE_CSS_VERSION + """">
+</head>
+<body>
+    <!-- +/- icons shared by the ISO and shutter steppers -->
+    <svg style="display:none">
+        <symbol id="ic-minus" viewBox="0 0 24 24"><path d="M19 13H5v-2h14v2z"/></symbol>
+        <symbol id="ic-plus" viewBox="0 0 24 24"><path d="M19 13h-6v6h-2v-6H5v-2h6V5h2v6h6v2z"/></symbol>
+    </svg>
+    <header class="app-bar">
+        <a href="/" class="icon-btn">
+            <svg fill="currentColor" viewBox="0 0 24 24"><path d="M20 11H7.83l5.59-5.59L12 4l-8 8 8 8 1.41-1.41L7.83 13H20v-2z"/></svg>
+        </a>
+        <div class="app-title">Controllo Live</div>
+    </header>
 
-    <!-- Lightbox -->
-    <div id="lightbox" class="lightbox" onclick="closeLightbox()">
-        <svg style="position: absolute; top: 24px; right: 24px; cursor: pointer;" width="32" height="32" fill="white" viewBox="0 0 24 24"><path d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/></svg>
-        <img id="lightbox-img" src="">
+    <div class="back-container">
+        <a href="/" class="icon-btn" style="background: rgba(0,0,0,0.5); backdrop-filter: blur(8px); border-radius: 50%;">
+            <svg fill="white" viewBox="0 0 24 24"><path d="M20 11H7.83l5.59-5.59L12 4l-8 8 8 8 1.41-1.41L7.83 13H20v-2z"/></svg>
+        </a>
     </div>
 
-    <!-- Power dialog -->
-    <div class="dialog-backdrop" id="power-dialog" onclick="closePowerDialog(event)">
-        <div class="power-dialog">
-            <div class="dialog-title">Alimentazione</div>
-            <button class="power-option reboot" onclick="systemReboot()">
-                <svg viewBox="0 0 24 24"><path d="M12 5V1L7 6l5 5V7c3.31 0 6 2.69 6 6s-2.69 6-6 6-6-2.69-6-6H4c0 4.42 3.58 8 8 8s8-3.58 8-8-3.58-8-8-8z"/></svg>
-                <div class="power-option-label">
-                    Riavvia
-                    <span>Il Raspberry Pi si riavvierà</span>
+    <main class="preview-wrapper">
+        <img id="preview" src="/stream.mjpg" alt="Stream Camera">
+        
+        <div class="status-overlay">
+            <div class="pulse"></div>
+            <span>LIVE <span id="res-info" style="opacity: 0.6; font-size: 10px; margin-left: 4px"></span></span>
+        </div>
+
+        <div id="offline-msg" class="offline-overlay">
+            <svg width="48" height="48" fill="var(--m3-outline)" viewBox="0 0 24 24"><path d="M9 2L7.17 4H4c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V6c0-1.1-.9-2-2-2h-3.17L15 2H9zm3 15c-2.76 0-5-2.24-5-5s2.24-5 5-5 5 2.24 5 5-2.24 5-5 5z"/><circle cx="12" cy="12" r="3"/></svg>
+            <span style="font-weight:500">Telecomando non attivo</span>
+            <span style="font-size: 14px; color: var(--m3-on-surface-variant)">Tocca lo schermo della camera</span>
+        </div>
+    </main>
+
+    <footer class="control-panel">
+        <div class="controls-row">
+            <!-- ISO -->
+            <div class="m3-card">
+                <span class="label">ISO</span>
+                <span id="iso-val" class="value">--</span>
+                <div class="adj-btns">
+                    <button onclick="sendCommand('ISO_DOWN')" class="btn-tonal"><svg fill="currentColor"><use href="#ic-minus"/></svg></button>
+                    <button onclick="sendCommand('ISO_UP')" class="btn-tonal"><svg fill="currentColor"><use href="#ic-plus"/></svg></button>
                 </div>
+            </div>
+
+            <!-- Capture -->
+            <button onclick="sendCommand('CAPTURE')" class="fab-capture">
+                <svg fill="currentColor" viewBox="0 0 24 24"><path d="M9 2L7.17 4H4c-1.1 0-2 .9-2 2v12c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V6c0-1.1-.9-2-2-2h-3.17L15 2H9zm3 15c-2.76 0-5-2.24-5-5s2.24-5 5-5 5 2.24 5 5-2.24 5-5 5z"/><circle cx="12" cy="12" r="3"/></svg>
             </button>
-            <button class="power-option shutdown" onclick="systemShutdown()">
-                <svg viewBox="0 0 24 24"><path d="M13 3h-2v10h2V3zm4.83 2.17l-1.42 1.42C17.99 7.86 19 9.81 19 12c0 3.87-3.13 7-7 7s-7-3.13-7-7c0-2.19 1.01-4.14 2.58-5.42L6.17 5.17C4.23 6.82 3 9.26 3 12c0 4.97 4.03 9 9 9s9-4.03 9-9c0-2.74-1.23-5.18-3.17-6.83z"/></svg>
-                <div class="power-option-label">
-                    Spegni
-                    <span>Il Raspberry Pi si spegnerà</span>
+
+            <!-- Shutter -->
+            <div class="m3-card">
+                <span class="label">Otturatore</span>
+                <span id="shutter-val" class="value">--</span>
+                <div class="adj-btns">
+                    <button onclick="sendCommand('SHUTTER_DOWN')" class="btn-tonal"><svg fill="currentColor"><use href="#ic-minus"/></svg></button>
+                    <button onclick="sendCommand('SHUTTER_UP')" class="btn-tonal"><svg fill="currentColor"><use href="#ic-plus"/></svg></button>
                 </div>
-            </button>
-            <button class="dialog-cancel" onclick="closePowerDialog()">Annulla</button>
+            </div>
         </div>
-    </div>
+    </footer>
+
 
     <script>
-        // ── Selection mode ────────────────────────────────────────────────
-        let selectMode = false;
-        const selected = new Set();
+        function sendCommand(cmd) {
+            fetch('/api/command', {
+                method: 'POST',
+                body: JSON.stringify({command: cmd}),
+                headers: {'Content-Type': 'application/json'}
+            });
+        }
 
-        function toggleSelectMode() {{
-            selectMode ? exitSelectMode() : enterSelectMode();
-        }}
+        // Elements and media query looked up once
+        const isoEl = document.getElementById('iso-val');
+        const shutterEl = document.getElementById('shutter-val');
+        const offline = document.getElementById('offline-msg');
+        const preview = document.getElementById('preview');
+        const resInfo = document.getElementById('res-info');
+        const backBtn = document.querySelector('.back-container');
+        const landscapeMQ = window.matchMedia("(orientation: landscape)");
+
+        function updateBackButton() {
+            backBtn.style.display = landscapeMQ.matches ? 'block' : 'none';
+        }
+        landscapeMQ.addEventListener('change', updateBackButton);
+        updateBackButton();
+
+        function updateStatus(data) {
+            // Read everything first, then write the DOM in a single frame
+            const showOffline = data.mode !== 'remote';
+            requestAnimationFrame(() => {
+                isoEl.textContent = data.iso;
+                shutterEl.textContent = data.shutter;
+                offline.style.display = showOffline ? 'flex' : 'none';
+                preview.style.opacity = showOffline ? 0.3 : 1;
+            });
+        }
 
-        function enterSelectMode() {{
-            selectMode = true;
-            document.body.classList.add('select-mode');
-            document.getElementById('normal-bar').style.display = 'none';
-            document.getElementById('sel-bar').classList.add('visible');
-            updateSelectionUI();
-        }}
+        // Show frame dimensions in the LIVE badge for diagnosis. Status events
+        // are rare and usually beat the first frame, so follow the stream
+        // itself; not every browser fires load per MJPEG frame, hence the timer
+        function updateResolution() {
+            if (preview.naturalWidth === 0) return;
+            const res = `${preview.naturalWidth}x${preview.naturalHeight}`;
+            if (resInfo.textContent !== res) resInfo.textContent = res;
+        }
+        preview.addEventListener('load', updateResolution);
+        setInterval(updateResolution, 2000);
+
+        // The server pushes status only when it changes. The stream is also
+        // our presence: opening it puts the camera in remote mode, and the
+        // server hands control back once the last live page disconnects
+        const statusStream = new EventSource('/api/status/stream');
+        statusStream.onmessage = ev => updateStatus(JSON.parse(ev.data));
+        statusStream.onerror = () => console.log('Conn error');
+    </script>
+</body>
+</html>
+""").encode('utf-8')
+LIVE_HTML_GZ = gzip.compress(LIVE_HTML, compresslevel=9, mtime=0)
 
-        function exitSelectMode() {{
-            selectMode = false;
-            selected.clear();
-            document.body.classList.remove('select-mode');
-            document.getElementById('normal-bar').style.display = '';
-            document.getElementById('sel-bar').classList.remove('visible');
-            document.getElementById('bulk-bar').classList.remove('visible');
-            document.querySelectorAll('.m3-card.selected').forEach(c => c.classList.remove('selected'));
-        }}
 
-        function selectAll() {{
-            document.querySelectorAll('.m3-card[data-filename]').forEach(card => {{
-                selected.add(card.dataset.filename);
-                card.classList.add('selected');
-            }});
-            updateSelectionUI();
-        }}
+class PhotoHandler(SimpleHTTPRequestHandler):
+    """Custom handler to serve photos"""
+    
+    # Keep connections open between the page, its assets and the status polls;
+    # every response must therefore carry a length, be chunked, or close
+    protocol_version = "HTTP/1.1"
+    timeout = REQUEST_TIMEOUT
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(PHOTOS_DIR), **kwargs)
+    
+    def setup(self):
+        """Disable Nagle so small writes (MJPEG parts, JSON) go out immediately"""
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def handle_one_request(self):
+        """Wait only KEEPALIVE_TIMEOUT for the next request: an idle kept-alive
+        connection parks a pool worker, so hand it back quickly"""
+        self.connection.settimeout(KEEPALIVE_TIMEOUT)
+        super().handle_one_request()
+
+    def parse_request(self):
+        """A request line has arrived: allow the full timeout for the rest of it"""
+        self.connection.settimeout(REQUEST_TIMEOUT)
+        return super().parse_request()
+    
+    def set_cork(self, enabled):
+        """Toggle TCP_CORK (Linux only) to coalesce headers with the body"""
+        if hasattr(socket, 'TCP_CORK'):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if enabled else 0)
+    
+    def do_GET(self):
+        """Handle GET requests"""
+        route, _, query = self.path.partition('?')
+        # Photo links are percent-encoded (spaces, quotes, ...)
+        name = urllib.parse.unquote(route[1:])
+        if route == '/':
+            self.list_directory(self.path)
+        elif self.path == '/live':
+            self.serve_live_page()
+        elif self.path == '/api/status':
+            self.serve_status()
+        elif self.path == '/api/status/stream':
+            self.serve_status_stream()
+        elif self.path == '/stream.mjpg':
+            self.serve_mjpeg_stream()
+        elif self.path == '/preview.jpg':
+            self.serve_preview()
+        elif route == '/app.js':
+            self.serve_static(GALLERY_JS_BYTES, GALLERY_JS_GZ, 'application/javascript; charset=utf-8')
+        elif route == '/app.css':
+            self.serve_static(GALLERY_CSS_BYTES, GALLERY_CSS_GZ, 'text/css; charset=utf-8')
+        elif route == '/live.css':
+            self.serve_static(LIVE_CSS_BYTES, LIVE_CSS_GZ, 'text/css; charset=utf-8')
+        elif route.startswith('/thumbs/'):
+            self.serve_thumbnail(route[len('/thumbs/'):], query)
+        elif is_photo_name(name):
+            self.serve_photo(name, query)
+        else:
+            # Fallback to serving files
+            super().do_GET()
 
-        function toggleCard(card, filename) {{
-            if (!selectMode) return;
-            if (selected.has(filename)) {{
-                selected.delete(filename);
-                card.classList.remove('selected');
-            }} else {{
-                selected.add(filename);
-                card.classList.add('selected');
-            }}
-            updateSelectionUI();
-        }}
+    def do_POST(self):
+        """Handle POST requests (for delete, download zip, commands, and system control)"""
+        # Consume the body up front, whether or not the route uses it, so it can't
+        # be read as the next request on a kept-alive connection
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_POST_BODY:
+            # A negative length would read to EOF and hold the worker until timeout
+            self.close_connection = True
+            self.send_error(400, "Invalid Content-Length")
+            return
+        body = self.rfile.read(length)
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            # Not decoded here; the connection can't be reused past it
+            self.close_connection = True
 
-        function updateSelectionUI() {{
-            const n = selected.size;
-            document.getElementById('sel-count').textContent = n === 1 ? '1 selezionata' : n + ' selezionate';
-            const hasAny = n > 0;
-            document.getElementById('btn-download-sel').disabled = !hasAny;
-            document.getElementById('btn-delete-sel').disabled = !hasAny;
-            document.getElementById('bulk-bar').classList.toggle('visible', hasAny);
-        }}
+        if self.path.startswith('/delete/'):
+            # The card form posts the percent-encoded name
+            filename = urllib.parse.unquote(self.path[len('/delete/'):])
+            
+            try:
+                if not is_photo_name(filename):
+                    self.send_error(404, "File not found")
+                    return
+                os.unlink(os.path.join(PHOTOS_DIR_STR, filename))
+                remove_thumbnail(filename)
+                print(f"Deleted file: {filename}")
+                
+                # Redirect back to gallery
+                self.send_response(303)
+                self.send_header('Location', '/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            except FileNotFoundError:
+                self.send_error(404, "File not found")
+            except Exception as e:
+                self.send_error(500, f"Error deleting file: {e}")
 
-        // ── Download ZIP ──────────────────────────────────────────────────
-        async function downloadSelected() {{
-            if (!selected.size) return;
-            const btn = document.getElementById('btn-download-sel');
-            btn.disabled = true;
-            btn.textContent = 'Preparazione…';
-            try {{
-                const res = await fetch('/download_zip', {{
-                    method: 'POST',
-                    headers: {{'Content-Type': 'application/json'}},
-                    body: JSON.stringify({{files: [...selected]}})
-                }});
-                if (!res.ok) throw new Error('Server error');
-                const blob = await res.blob();
-                const url = URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                const cd = res.headers.get('Content-Disposition') || '';
-                const m = cd.match(/filename="?([^"]+)"?/);
-                a.download = m ? m[1] : 'foto.zip';
-                a.click();
-                URL.revokeObjectURL(url);
-            }} catch(e) {{
-                alert('Errore durante il download: ' + e.message);
-            }} finally {{
-                btn.disabled = false;
-                btn.innerHTML = '<svg viewBox="0 0 24 24" style="width:20px;height:20px;fill:currentColor"><path d="M19 9h-4V3H9v6H5l7 7 7-7zM5 18v2h14v-2H5z"/></svg> Scarica';
-                updateSelectionUI();
-            }}
-        }}
+        elif self.path == '/delete_multiple':
+            try:
+                data = json_loads(body)
+                files = data.get('files', [])
+                deleted, errors = [], []
+                valid = []
+                for name in files:
+                    # Reject anything that isn't a plain photo name without touching the FS
+                    if is_photo_name(name):
+                        valid.append(name)
+                    else:
+                        errors.append(name)
+                # Unlinks are latency-bound on the SD card, so overlap them
+                for name, ok in zip(valid, IO_POOL.map(delete_photo, valid)):
+                    (deleted if ok else errors).append(name)
+                self.send_json(json_dumps({'deleted': deleted, 'errors': errors}))
+            except Exception as e:
+                self.send_error(500, f"Error in batch delete: {e}")
 
-        // ── Delete selected ───────────────────────────────────────────────
-        async function deleteSelected() {{
-            if (!selected.size) return;
-            const n = selected.size;
-            if (!confirm('Eliminare definitivamente ' + n + ' foto?')) return;
-            const btn = document.getElementById('btn-delete-sel');
-            btn.disabled = true;
-            btn.textContent = 'Eliminazione…';
-            try {{
-                const res = await fetch('/delete_multiple', {{
-                    method: 'POST',
-                    headers: {{'Content-Type': 'application/json'}},
-                    body: JSON.stringify({{files: [...selected]}})
-                }});
-                const data = await res.json();
-                data.deleted.forEach(name => {{
-                    const card = document.querySelector('.m3-card[data-filename="' + name + '"]');
-                    if (card) card.remove();
-                    selected.delete(name);
-                }});
-                if (data.errors.length) {{
-                    alert('Alcuni file non trovati: ' + data.errors.join(', '));
-                }}
-                const total = document.querySelectorAll('.m3-card[data-filename]').length;
-                const ph = document.getElementById('photo-count');
-                if (ph) ph.textContent = total + ' Scatti salvati';
-            }} catch(e) {{
-                alert('Errore: ' + e.message);
-            }} finally {{
-                exitSelectMode();
-            }}
-        }}
+        elif self.path == '/download_zip':
+            try:
+                data = json_loads(body)
+                files = data.get('files', [])
+                paths = []
+                for name in files:
+                    if not is_photo_name(name):
+                        continue
+                    fp = os.path.join(PHOTOS_DIR_STR, name)
+                    if os.path.isfile(fp):
+                        paths.append((name, fp))
+                ts = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+                filename = f'foto_{ts}.zip'
+            except Exception as e:
+                self.send_error(500, f"Error creating ZIP: {e}")
+                return
+
+            # Stream the archive as it is built. JPEGs don't deflate, so entries are
+            # STORED. The size isn't known up front: chunked, so a transfer cut short
+            # lacks the final chunk and the browser's fetch fails instead of saving
+            # a truncated ZIP; HTTP/1.0 clients get a body ended by closing.
+            chunked = self.request_version == 'HTTP/1.1'
+            self.set_cork(True)
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/zip')
+                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+                if chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                else:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+                out = ChunkedWriter(self.wfile) if chunked else self.wfile
+                with zipfile.ZipFile(out, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+                    for name, fp in paths:
+                        try:
+                            zinfo = zipfile.ZipInfo.from_file(fp, name)
+                            src = open(fp, 'rb')
+                        except FileNotFoundError:
+                            # Deleted since the request was checked: leave it out
+                            print(f"ZIP: skipped vanished photo {name}")
+                            continue
+                        with src, zf.open(zinfo, 'w') as dst:
+                            shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK)
+                if chunked:
+                    out.close()
+            except OSError as e:
+                # Don't terminate the body: the client must see the download fail
+                print(f"ZIP stream aborted: {e}")
+                self.close_connection = True
+            finally:
+                try:
+                    self.set_cork(False)
+                except OSError:
+                    pass # Socket already gone; keep the original error
 
-        // ── Lightbox ──────────────────────────────────────────────────────
-        function openLightbox(src) {{
-            if (selectMode) return;
-            document.getElementById('lightbox-img').src = src;
-            document.getElementById('lightbox').classList.add('active');
-            document.body.style.overflow = 'hidden';
-        }}
-        function closeLightbox() {{
-            document.getElementById('lightbox').classList.remove('active');
-            document.body.style.overflow = 'auto';
-        }}
+        elif self.path == '/system/shutdown':
+            self.send_json(b'{"status":"shutting down"}')
+            print("Shutdown requested via web")
+            subprocess.Popen(['sudo', 'shutdown', 'now'])
 
-        // ── Power dialog ──────────────────────────────────────────────────
-        function openPowerDialog() {{
-            document.getElementById('power-dialog').classList.add('open');
-        }}
-        function closePowerDialog(e) {{
-            if (!e || e.target === document.getElementById('power-dialog'))
-                document.getElementById('power-dialog').classList.remove('open');
-        }}
+        elif self.path == '/system/reboot':
+            self.send_json(b'{"status":"rebooting"}')
+            print("Reboot requested via web")
+            subprocess.Popen(['sudo', 'reboot'])
 
-        async function systemReboot() {{
-            if (!confirm('Riavviare il Raspberry Pi?')) return;
-            closePowerDialog();
-            await fetch('/system/reboot', {{method: 'POST'}});
-            alert('Riavvio in corso… la pagina non risponderà per qualche minuto.');
-        }}
+        elif self.path == '/api/command':
+            try:
+                data = json_loads(body)
+                command = data.get('command')
+                if command:
+                    self.send_udp_command(command)
+                    self.send_json(b'{"status":"ok"}')
+                else:
+                    self.send_error(400, "Missing command")
+            except Exception as e:
+                self.send_error(500, f"Error processing command: {e}")
 
-        async function systemShutdown() {{
-            if (!confirm('Spegnere il Raspberry Pi?')) return;
-            closePowerDialog();
-            await fetch('/system/shutdown', {{method: 'POST'}});
-            alert('Spegnimento in corso…');
-        }}
-    </script>
-</body>
-</html>
-"""
+        else:
+            self.send_error(404, "Not found")
+
+    def send_json(self, body, etag=None):
+        """Send a 200 response with an already-encoded JSON body"""
         self.send_response(200)
-        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
         self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
+        self.wfile.write(body)
+
+    def copyfile(self, source, outputfile):
+        """Copy files served by the fallback handler with sendfile(2) too.
+        socket.sendfile falls back to a send loop if the kernel can't."""
+        self.connection.sendfile(source)
+
+    def send_jpeg_file(self, f, etag=None, cache_control=None):
+        """Send an open JPEG file as a 200 response"""
+        size = os.fstat(f.fileno()).st_size
+        self.send_response(200)
+        self.send_header('Content-type', 'image/jpeg')
+        self.send_header('Content-Length', str(size))
+        if etag:
+            self.send_header('ETag', etag)
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        # Let the kernel copy the file straight to the socket (sendfile)
+        self.connection.sendfile(f, 0, size)
+
+    def etag_matches(self, etag):
+        """True if the request's If-None-Match covers etag"""
+        if_none_match = self.headers.get('If-None-Match')
+        # Weak comparison: a front proxy may hand back our tag as W/"..."
+        return bool(if_none_match) and any(tag.strip().removeprefix('W/') in (etag, '*')
+                                           for tag in if_none_match.split(','))
+
+    def send_cached_jpeg(self, path, query):
+        """Serve a photo or thumbnail, answering 304 when the browser already has it.
+        Only versioned URLs (?v=<mtime>, as the gallery links them) are immutable;
+        a bare name may be overwritten, so the browser revalidates it."""
+        cache_control = PHOTO_CACHE_CONTROL if 'v' in urllib.parse.parse_qs(query) else 'no-cache'
+        st = os.stat(path)
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        if self.etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            self.send_jpeg_file(f, etag, cache_control)
+
+    def serve_static(self, body, body_gz, content_type, cache_control=PHOTO_CACHE_CONTROL):
+        """Serve an asset built at import, gzipped when the client accepts it"""
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if use_gzip:
+            body = body_gz
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_udp_command(self, command):
+        """Send command to camera app via UDP"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(command.encode('utf-8'), ('localhost', UDP_PORT))
+        except Exception as e:
+            print(f"UDP Error: {e}")
+
+    def serve_status(self):
+        """Serve camera status from shared memory, 304 if the poller has it already"""
+        try:
+            body = read_status()
+        except Exception:
+            self.send_error(500, "Error reading status")
+            return
+        etag = '"%08x"' % zlib.crc32(body)
+        if self.etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+        self.send_json(body, etag)
+
+    def serve_status_stream(self):
+        """Push camera status changes to the live page as Server-Sent Events.
+        While the page is connected this also keeps the camera in remote mode."""
+        if not status_stream_slots.acquire(blocking=False):
+            self.send_error(503, "Too many live viewers")
+            return
+        with _live_viewers_lock:
+            _live_viewers['count'] += 1
+            if _live_viewers['count'] == 1:
+                self.send_udp_command('START_REMOTE')
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            
+            last_status = None
+            next_heartbeat = 0
+            while True:
+                status = read_status().strip()
+                if status != last_status:
+                    self.wfile.write(b'data: %b\n\n' % status)
+                    last_status = status
+                now = time.monotonic()
+                if now >= next_heartbeat:
+                    self.send_udp_command('HEARTBEAT')
+                    # Comment line: ignored by EventSource, but fails fast once the page is gone
+                    self.wfile.write(b': keepalive\n\n')
+                    next_heartbeat = now + STATUS_HEARTBEAT_INTERVAL
+                # Wait for the next poll, but wake as soon as the page hangs up
+                # (EventSource never sends after the request, so readable means EOF)
+                if select.select([self.connection], [], [], STATUS_POLL_INTERVAL)[0]:
+                    break
+        except Exception:
+            pass # Client disconnected
+        finally:
+            with _live_viewers_lock:
+                _live_viewers['count'] -= 1
+                if _live_viewers['count'] == 0:
+                    self.send_udp_command('STOP_REMOTE')
+            status_stream_slots.release()
+
+    def serve_preview(self):
+        """Serve preview image from shared memory"""
+        try:
+            if os.path.exists(SHARED_MEM_PREVIEW):
+                with open(SHARED_MEM_PREVIEW, 'rb') as f:
+                    self.send_jpeg_file(f)
+            else:
+                self.send_error(404, "No preview available")
+        except Exception:
+            self.send_error(500, "Error reading preview")
+
+    def serve_thumbnail(self, path, query=''):
+        """Serve a cached gallery thumbnail (<width>/<name>), generating it on first request"""
+        width, _, name = path.partition('/')
+        # The gallery percent-encodes names, so match on the decoded one
+        name = urllib.parse.unquote(name)
+        if not width.isdigit() or int(width) not in THUMB_WIDTHS or not is_photo_name(name):
+            self.send_error(404, "File not found")
+            return
+        if not PIL_AVAILABLE:
+            # No Pillow: hand out the full-size photo instead
+            self.send_response(302)
+            location = '/' + urllib.parse.quote(name)
+            self.send_header('Location', f'{location}?{query}' if query else location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        try:
+            self.send_cached_jpeg(ensure_thumbnail(name, int(width)), query)
+        except FileNotFoundError:
+            self.send_error(404, "File not found")
+        except Exception as e:
+            self.send_error(500, f"Error creating thumbnail: {e}")
+
+    def serve_photo(self, name, query=''):
+        """Serve a full-size photo with ETag and long-lived caching"""
+        try:
+            self.send_cached_jpeg(os.path.join(PHOTOS_DIR_STR, name), query)
+        except FileNotFoundError:
+            self.send_error(404, "File not found")
+
+    def serve_mjpeg_stream(self):
+        """Serve MJPEG stream from shared memory"""
+        if not frame_broadcaster.subscribe():
+            self.send_error(503, "Too many live viewers")
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Age', '0')
+            self.send_header('Cache-Control', 'no-cache, private')
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=FRAME')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            
+            seq = 0
+            while True:
+                # A timeout returns the same frame again, so dead clients still get noticed
+                seq, part = frame_broadcaster.next_frame(seq, STREAM_KEEPALIVE)
+                if part is not None:
+                    self.wfile.write(part)
+        except Exception:
+            pass # Client disconnected
+        finally:
+            frame_broadcaster.unsubscribe()
+
+    def serve_live_page(self):
+        """Serve the Live Control interface in Material Design 3 style"""
+        # Unversioned URL: let the browser keep it but revalidate each load
+        self.serve_static(LIVE_HTML, LIVE_HTML_GZ, 'text/html', cache_control='no-cache')
+
+    def list_directory(self, path):
+        """Override to show a beautiful Material Design 3 photo gallery.
+        With ?offset= only that page of cards is sent, for the scroll loader."""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)
+        fragment = 'offset' in query
+        try:
+            offset = max(int(query.get('offset', ['0'])[0]), 0)
+            limit = min(max(int(query.get('limit', [str(GALLERY_PAGE_SIZE)])[0]), 1), GALLERY_PAGE_MAX)
+        except ValueError:
+            self.send_error(400, "Invalid offset or limit")
+            return None
+        try:
+            photos = list_photos()
+        except OSError:
+            self.send_error(404, "Cannot list directory")
+            return None
+        
+        photo_count = len(photos)
+        page = photos[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < photo_count else None
+        
+        # Stream the page: the browser can start on the CSS while cards are still
+        # being formatted, and the full document is never held in memory.
+        # The length isn't known up front: chunked for HTTP/1.1 clients, so the
+        # connection stays open for the assets, otherwise ended by closing.
+        # Static parts and cards are deflated ahead of time; gzip responses are
+        # spliced together from those pieces.
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        chunked = self.request_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        if fragment and next_offset is not None:
+            self.send_header('X-Next-Offset', str(next_offset))
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        if self.command == 'HEAD':
+            # Reached through SimpleHTTPRequestHandler.do_HEAD: headers only
+            return None
+        
+        body = ChunkedWriter(self.wfile) if chunked else self.wfile
+        out = GzipPieceWriter(body) if use_gzip else PlainPieceWriter(body)
+        if not fragment:
+            out.write(GALLERY_HEAD, GALLERY_HEAD_GZ)
+            count = str(photo_count).encode()
+            info = GALLERY_INFO % (count, count, get_ip_address().encode())
+            out.write(info, deflate_piece(info) if use_gzip else None)
+        
+        if not photos and not fragment:
+            out.write(GALLERY_EMPTY, GALLERY_EMPTY_GZ)
+        else:
+            batch = []
+            batch_gz = []
+            for card in get_cards(page):
+                batch.append(card[0])
+                batch_gz.append(card[1])
+                if len(batch) == GALLERY_CARDS_PER_WRITE:
+                    out.write(b''.join(batch), b''.join(batch_gz))
+                    batch.clear()
+                    batch_gz.clear()
+            if batch:
+                out.write(b''.join(batch), b''.join(batch_gz))
+
+        if not fragment:
+            if next_offset is not None:
+                more = b'<div id="more" class="more" data-next="%d"></div>' % next_offset
+                out.write(more, deflate_piece(more) if use_gzip else None)
+            out.write(GALLERY_TAIL, GALLERY_TAIL_GZ)
+        out.close()
+        if chunked:
+            body.close()
 
 def run_server():
     """Start the server"""
@@ -0,0 +1,83 @@
+"""Gallery thumbnail route: names the gallery percent-encodes must resolve"""
+import http.client
+import os
+import tempfile
+import threading
+import types
+import unittest
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_photo_server(home):
+    """Load photo_server.py with ~ pointed at `home`, without running the server"""
+    with open(os.path.join(ROOT, 'photo_server.py'), encoding='utf-8') as f:
+        source = f.read()
+    # Everything after the entry point is left out
+    source = source[:source.index("\nif __name__ == '__main__':")]
+    module = types.ModuleType('photo_server')
+    module.__file__ = os.path.join(ROOT, 'photo_server.py')
+    old_home = os.environ.get('HOME')
+    os.environ['HOME'] = home
+    try:
+        exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    finally:
+        if old_home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = old_home
+    return module
+
+
+class ThumbnailNameTest(unittest.TestCase):
+    NAMES = ("it's a&b.jpg", "photo 2026.jpg", "photo_20260101_120000.jpg")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(cls.tmp.name, 'photos'))
+        cls.ps = load_photo_server(cls.tmp.name)
+        if not cls.ps.PIL_AVAILABLE:
+            cls.tmp.cleanup()
+            raise unittest.SkipTest("Pillow not installed")
+        for name in cls.NAMES:
+            cls.ps.Image.new('RGB', (800, 600), 'gray').save(
+                os.path.join(cls.ps.PHOTOS_DIR_STR, name), 'JPEG')
+        cls.httpd = cls.ps.ThreadedHTTPServer(('127.0.0.1', 0), cls.ps.PhotoHandler)
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        cls.tmp.cleanup()
+
+    def get(self, path):
+        conn = http.client.HTTPConnection(*self.httpd.server_address, timeout=10)
+        try:
+            conn.request('GET', path)
+            resp = conn.getresponse()
+            return resp, resp.read()
+        finally:
+            conn.close()
+
+    def test_encoded_names(self):
+        for name in self.NAMES:
+            for width in self.ps.THUMB_WIDTHS:
+                with self.subTest(name=name, width=width):
+                    resp, body = self.get(f"/thumbs/{width}/{urllib.parse.quote(name)}?v=1")
+                    self.assertEqual(resp.status, 200)
+                    self.assertEqual(resp.getheader('Content-Type'), 'image/jpeg')
+                    self.assertTrue(body.startswith(b'\xff\xd8'))
+
+    def test_rejects_paths(self):
+        for path in ("/thumbs/320/..%2Fsecret.jpg", "/thumbs/320/.hidden.jpg",
+                     "/thumbs/320/notes.txt", "/thumbs/999/photo%202026.jpg"):
+            with self.subTest(path=path):
+                resp, _ = self.get(path)
+                self.assertEqual(resp.status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()